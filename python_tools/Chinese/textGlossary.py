@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 术语一致性检查：人名、舰名、专有名词在译文里必须用规定的译法。
+# 所有术语原文建一个 Aho-Corasick 自动机，每条 original 线性扫一遍就得到出现的全部术语，
+# 再看 translation 里有没有对应的规定译名；缺了就报出来。整个 JSON 树可以按文件并行检查。
+#
+# 术语表（UTF-8）：每行 "原文=译名"，一个原文允许多种译名时用 | 分隔；# 或 ; 开头为注释。
+# 也可以是 JSON：{"原文": "译名"} 或 {"原文": ["译名1", "译名2"]}。
+
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from textJson import iter_json_files
+
+Glossary = List[Tuple[str, Tuple[str, ...]]]
+
+
+class AhoCorasick:
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns: List[str] = []
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # 每个状态结束的模式编号（含 fail 链上的）
+        self.out: List[List[int]] = [[]]
+
+        for pid, pat in enumerate(patterns):
+            self.patterns.append(pat)
+            s = 0
+            for ch in pat:
+                nxt = self.goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[s][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                s = nxt
+            self.out[s].append(pid)
+
+        q = deque(self.goto[0].values())
+        while q:
+            s = q.popleft()
+            for ch, nxt in self.goto[s].items():
+                q.append(nxt)
+                f = self.fail[s]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        # (起点, 终点(不含), 模式编号)
+        goto, fail, out, pats = self.goto, self.fail, self.out, self.patterns
+        s = 0
+        for i, ch in enumerate(text):
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            for pid in out[s]:
+                yield i + 1 - len(pats[pid]), i + 1, pid
+
+
+def load_glossary(path: Path) -> Glossary:
+    if path.suffix.lower() == ".json":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if not isinstance(data, dict):
+            raise ValueError(f"术语表 JSON 必须是对象：{path}")
+        pairs = [(k, (v,) if isinstance(v, str) else tuple(v)) for k, v in data.items()]
+    else:
+        pairs = []
+        for lineno, raw in enumerate(path.read_text(encoding="utf-8-sig").splitlines(), start=1):
+            s = raw.strip()
+            if not s or s.startswith("#") or s.startswith(";"):
+                continue
+            if "=" not in s:
+                raise ValueError(f"{path}:{lineno}: 缺少 '='：{raw}")
+            src, dst = s.split("=", 1)
+            pairs.append((src.strip(), tuple(t.strip() for t in dst.split("|"))))
+
+    # 同一原文出现多次时合并允许的译名
+    merged: Dict[str, List[str]] = {}
+    for src, dsts in pairs:
+        if not src:
+            continue
+        allowed = merged.setdefault(src, [])
+        for d in dsts:
+            if isinstance(d, str) and d and d not in allowed:
+                allowed.append(d)
+    return [(src, tuple(allowed)) for src, allowed in merged.items() if allowed]
+
+
+@dataclass(frozen=True)
+class Violation:
+    path: str
+    key: str
+    term: str
+    expected: Tuple[str, ...]
+    original: str
+    translation: str
+
+
+class GlossaryChecker:
+    def __init__(self, glossary: Glossary) -> None:
+        self.glossary = glossary
+        self.ac = AhoCorasick(src for src, _ in glossary)
+
+    def terms_in(self, text: str) -> List[int]:
+        # 出现的术语编号（去重，按出现顺序）；被更长术语完全覆盖的短术语不算，
+        # 例如 "ミルフィーユ・桜葉" 命中时不再单独要求 "ミルフィーユ" 的译名
+        spans = sorted(self.ac.iter_matches(text), key=lambda m: (m[0], -m[1]))
+        kept: List[int] = []
+        cover_end = -1
+        for start, end, pid in spans:
+            if end <= cover_end:
+                continue
+            cover_end = end
+            if pid not in kept:
+                kept.append(pid)
+        return kept
+
+    def check_item(self, path: str, item: dict) -> List[Violation]:
+        orig, tr = item.get("original"), item.get("translation")
+        if not isinstance(orig, str) or not isinstance(tr, str) or not tr:
+            return []
+        bad: List[Violation] = []
+        for pid in self.terms_in(orig):
+            src, dsts = self.glossary[pid]
+            if not any(d in tr for d in dsts):
+                key = item.get("key") if isinstance(item.get("key"), str) else ""
+                bad.append(Violation(path, key, src, dsts, orig, tr))
+        return bad
+
+    def check_file(self, jp: Path) -> List[Violation]:
+        items = json.loads(jp.read_text(encoding="utf-8"))
+        if not isinstance(items, list):
+            return []
+        out: List[Violation] = []
+        for it in items:
+            if isinstance(it, dict):
+                out.extend(self.check_item(jp.as_posix(), it))
+        return out
+
+
+# 进程池 worker 各自建一次自动机
+_worker_checker: Optional[GlossaryChecker] = None
+
+
+def _init_worker(glossary: Glossary) -> None:
+    global _worker_checker
+    _worker_checker = GlossaryChecker(glossary)
+
+
+def _check_one(jp: Path) -> Tuple[Path, List[Violation], Optional[str]]:
+    if _worker_checker is None:
+        raise RuntimeError("_init_worker 未调用")
+    try:
+        return jp, _worker_checker.check_file(jp), None
+    except Exception as e:
+        return jp, [], f"{type(e).__name__}: {e}"
+
+
+def check_dir(json_dir: Path, glossary: Glossary, jobs: int = 1) -> Tuple[List[Violation], List[Tuple[Path, str]]]:
+    files = iter_json_files(json_dir)
+    if jobs <= 1 or len(files) <= 1:
+        _init_worker(glossary)
+        results = [_check_one(jp) for jp in files]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(glossary,)) as ex:
+            results = list(ex.map(_check_one, files, chunksize=max(1, len(files) // (jobs * 8))))
+    violations = [v for _, vs, _ in results for v in vs]
+    errors = [(jp, err) for jp, _, err in results if err is not None]
+    return violations, errors
+
+
+def _one_line(s: str) -> str:
+    return s.replace("\r", "").replace("\n", "\\n")
+
+
+_USAGE = (
+    "用法：\n"
+    "  python textGlossary.py <术语表.txt|术语表.json> <json目录> [report.json] [--jobs N]\n"
+    "\n"
+    "术语表每行 \"原文=译名\"，多种允许的译名用 | 分隔；# 或 ; 开头为注释。\n"
+    "有译文、原文含术语、译文里却没有规定译名的条目会被列出；给出 report.json 时另存一份完整结果\n"
+    "（report.json 不能放在 json目录 里，否则下次检查会把它当成翻译文件读进来）。\n"
+)
+
+
+def main(argv: Sequence[str]) -> int:
+    args: List[str] = []
+    jobs = os.cpu_count() or 1
+    it = iter(argv[1:])
+    for a in it:
+        if a in {"-j", "--jobs"}:
+            v = next(it, None)
+            if v is None:
+                print(f"{a} 缺少参数", file=sys.stderr)
+                return 2
+            jobs = int(v, 10)
+        elif a.startswith("--jobs="):
+            jobs = int(a.split("=", 1)[1], 10)
+        else:
+            args.append(a)
+    if len(args) not in (2, 3):
+        print(_USAGE, file=sys.stderr)
+        return 2
+    jobs = max(1, jobs)
+
+    json_dir = Path(args[1])
+    report_path = Path(args[2]) if len(args) == 3 else None
+    if report_path is not None and json_dir.resolve() in report_path.resolve().parents:
+        print(f"[ERROR] report.json 不能放在 json目录 里：{report_path}", file=sys.stderr)
+        return 2
+
+    glossary = load_glossary(Path(args[0]))
+    t0 = time.perf_counter()
+    violations, errors = check_dir(json_dir, glossary, jobs)
+    elapsed = time.perf_counter() - t0
+
+    for v in violations:
+        print(f"{v.path}\t{v.key}\t{v.term} -> {' | '.join(v.expected)}")
+        print(f"    原文: {_one_line(v.original)}")
+        print(f"    译文: {_one_line(v.translation)}")
+    for jp, err in errors:
+        print(f"[ERROR] {jp}: {err}", file=sys.stderr)
+
+    if report_path is not None:
+        report = [
+            {"path": v.path, "key": v.key, "term": v.term, "expected": list(v.expected),
+             "original": v.original, "translation": v.translation}
+            for v in violations
+        ]
+        report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    tag = "[WARN]" if violations or errors else "[OK]"
+    print(
+        f"{tag} 术语 {len(glossary)} 个，不一致 {len(violations)} 处，读取失败 {len(errors)} 个文件，"
+        f"{elapsed:.2f} s（jobs={jobs}）",
+        file=sys.stderr,
+    )
+    return 1 if violations or errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 剧情文本全文索引：把 textJson.py 产出的所有 JSON 条目放进 SQLite FTS5（trigram 分词，中日文子串可直接搜），
+# 查询直接给出 JSON 路径和 key。索引按文件 mtime/大小/sha1 增量更新，只重读变过的 JSON。
+
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import textJson
+from textJson import iter_json_files, parse_codeline_from_key, strip_paren_comments
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    k TEXT PRIMARY KEY,
+    v TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,      -- 相对 JSON 目录
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    asb_sig TEXT NOT NULL       -- 对应 .asb 的 mtime/大小（func id 来自它），没有就是空串
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    script TEXT NOT NULL,
+    key TEXT NOT NULL,
+    code_line INTEGER,
+    func INTEGER,
+    context TEXT NOT NULL,
+    original TEXT NOT NULL,
+    translation TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_path ON entries(path);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    original, translation, context,
+    content='entries', content_rowid='id', tokenize='trigram'
+);
+"""
+
+_FTS_COLUMNS = ("original", "translation", "context")
+
+
+def open_index(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _asb_sig(asb_path: Optional[Path]) -> str:
+    if asb_path is None or not asb_path.exists():
+        return ""
+    st = asb_path.stat()
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def _script_of(rel: Path) -> str:
+    # "abc(标题).json" -> "abc"，与写回时 json -> txt 的推导一致
+    return (rel.parent / strip_paren_comments(rel.stem)).as_posix()
+
+
+def _key_funcs(asb_path: Optional[Path]) -> Dict[str, int]:
+    if asb_path is None or not asb_path.exists():
+        return {}
+    return textJson.simulate_asb(asb_path.read_bytes(), {}, {}).key_funcs
+
+
+def _delete_file(conn: sqlite3.Connection, rel: str) -> None:
+    # 外部内容表的 FTS 需要带上旧值删除
+    rows = conn.execute("SELECT id, original, translation, context FROM entries WHERE path = ?", (rel,)).fetchall()
+    conn.executemany(
+        "INSERT INTO entries_fts(entries_fts, rowid, original, translation, context) VALUES('delete', ?, ?, ?, ?)",
+        rows,
+    )
+    conn.execute("DELETE FROM entries WHERE path = ?", (rel,))
+    conn.execute("DELETE FROM files WHERE path = ?", (rel,))
+
+
+def _insert_file(
+    conn: sqlite3.Connection,
+    rel: str,
+    items: Any,
+    funcs: Dict[str, int],
+) -> int:
+    script = _script_of(Path(rel))
+    n = 0
+    if not isinstance(items, list):
+        return 0
+    for it in items:
+        if not isinstance(it, dict):
+            continue
+        key = it.get("key", "")
+        if not isinstance(key, str) or not key:
+            continue
+        original = it.get("original") if isinstance(it.get("original"), str) else ""
+        translation = it.get("translation") if isinstance(it.get("translation"), str) else ""
+        context = it.get("context") if isinstance(it.get("context"), str) else ""
+        cur = conn.execute(
+            "INSERT INTO entries(path, script, key, code_line, func, context, original, translation) VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+            (rel, script, key, parse_codeline_from_key(key), funcs.get(key), context, original, translation),
+        )
+        conn.execute(
+            "INSERT INTO entries_fts(rowid, original, translation, context) VALUES(?, ?, ?, ?)",
+            (cur.lastrowid, original, translation, context),
+        )
+        n += 1
+    return n
+
+
+def build_index(json_dir: Path, db_path: Path, asb_dir: Optional[Path] = None) -> Tuple[int, int, int]:
+    # 返回 (重新索引的文件数, 未变化跳过的文件数, 删除的文件数)
+    conn = open_index(db_path)
+    try:
+        conn.execute("INSERT OR REPLACE INTO meta(k, v) VALUES('json_dir', ?)", (str(json_dir.resolve()),))
+        known = {
+            row[0]: row[1:]
+            for row in conn.execute("SELECT path, mtime_ns, size, sha1, asb_sig FROM files")
+        }
+
+        seen: set = set()
+        updated = skipped = 0
+        for jp in iter_json_files(json_dir):
+            rel = jp.relative_to(json_dir).as_posix()
+            seen.add(rel)
+            st = jp.stat()
+            asb_path = asb_dir / f"{_script_of(Path(rel))}.asb" if asb_dir is not None else None
+            asb_sig = _asb_sig(asb_path)
+
+            old = known.get(rel)
+            if old is not None and old[0] == st.st_mtime_ns and old[1] == st.st_size and old[3] == asb_sig:
+                skipped += 1
+                continue
+
+            data = jp.read_bytes()
+            sha1 = hashlib.sha1(data).hexdigest()
+            if old is not None and old[2] == sha1 and old[3] == asb_sig:
+                # 只是 touch 过，内容没变
+                conn.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?", (st.st_mtime_ns, st.st_size, rel))
+                skipped += 1
+                continue
+
+            try:
+                items = json.loads(data.decode("utf-8", errors="ignore"))
+            except ValueError as e:
+                # 坏文件不进 files 表（旧条目也清掉），修好后下次 build 会重新索引；不影响其他文件
+                print(f"[WARN] 跳过无法解析的 JSON：{jp}（{e}）", file=sys.stderr)
+                _delete_file(conn, rel)
+                continue
+            _delete_file(conn, rel)
+            _insert_file(conn, rel, items, _key_funcs(asb_path))
+            conn.execute(
+                "INSERT INTO files(path, mtime_ns, size, sha1, asb_sig) VALUES(?, ?, ?, ?, ?)",
+                (rel, st.st_mtime_ns, st.st_size, sha1, asb_sig),
+            )
+            updated += 1
+
+        removed = [rel for rel in known if rel not in seen]
+        for rel in removed:
+            _delete_file(conn, rel)
+        conn.commit()
+        return updated, skipped, len(removed)
+    finally:
+        conn.close()
+
+
+def _fts_phrase(s: str) -> str:
+    return '"' + s.replace('"', '""') + '"'
+
+
+def search(
+    conn: sqlite3.Connection,
+    query: str,
+    *,
+    column: Optional[str] = None,
+    func: Optional[int] = None,
+    limit: int = 50,
+) -> List[sqlite3.Row]:
+    # 3 个字符及以上走 FTS（trigram 子串匹配）；更短的 trigram 建不了索引，退回 LIKE 扫表
+    conn.row_factory = sqlite3.Row
+    cols = (column,) if column else _FTS_COLUMNS
+    where: List[str] = []
+    args: List[Any] = []
+    if len(query) >= 3:
+        match = " OR ".join(f"{c}:{_fts_phrase(query)}" for c in cols)
+        where.append("e.id IN (SELECT rowid FROM entries_fts WHERE entries_fts MATCH ?)")
+        args.append(match)
+    else:
+        where.append("(" + " OR ".join(f"e.{c} LIKE ? ESCAPE '\\'" for c in cols) + ")")
+        pat = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        args.extend([pat] * len(cols))
+    if func is not None:
+        where.append("e.func = ?")
+        args.append(func)
+    sql = (
+        "SELECT e.path, e.script, e.key, e.code_line, e.func, e.context, e.original, e.translation FROM entries e "
+        f"WHERE {' AND '.join(where)} ORDER BY e.path, e.id LIMIT ?"
+    )
+    args.append(limit)
+    return conn.execute(sql, args).fetchall()
+
+
+def _one_line(s: str) -> str:
+    return s.replace("\r", "").replace("\n", "\\n")
+
+
+def cmd_query(db_path: Path, query: str, column: Optional[str], func: Optional[int], limit: int) -> int:
+    conn = open_index(db_path)
+    try:
+        row = conn.execute("SELECT v FROM meta WHERE k = 'json_dir'").fetchone()
+        json_dir = Path(row[0]) if row else Path(".")
+        t0 = time.perf_counter()
+        rows = search(conn, query, column=column, func=func, limit=limit)
+        elapsed = time.perf_counter() - t0
+    finally:
+        conn.close()
+
+    for r in rows:
+        func_s = f"{r['func']:02X}" if r["func"] is not None else "--"
+        print(f"{json_dir / r['path']}\t{r['key']}\tfunc={func_s}\t{_one_line(r['context'])}")
+        print(f"    原文: {_one_line(r['original'])}")
+        if r["translation"]:
+            print(f"    译文: {_one_line(r['translation'])}")
+    print(f"[OK] {len(rows)} 条，{elapsed * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+
+_USAGE = (
+    "用法：\n"
+    "  建立/增量更新索引：\n"
+    "    python textIndex.py build <json目录> <索引.db> [asb目录]\n"
+    "      给出 asb目录（如 extract\\adv\\scn）时额外记录每条文本的 CALLB func id\n"
+    "\n"
+    "  查询（原文/译文/上下文子串）：\n"
+    "    python textIndex.py q <索引.db> <文本> [--in original|translation|context] [--func XX] [--limit N]\n"
+)
+
+
+def main(argv: Sequence[str]) -> int:
+    args = list(argv[1:])
+    if len(args) < 3 or args[0] not in {"build", "q"}:
+        print(_USAGE, file=sys.stderr)
+        return 2
+
+    if args[0] == "build":
+        if len(args) > 4:
+            print(_USAGE, file=sys.stderr)
+            return 2
+        asb_dir = Path(args[3]) if len(args) == 4 else None
+        t0 = time.perf_counter()
+        updated, skipped, removed = build_index(Path(args[1]), Path(args[2]), asb_dir)
+        print(
+            f"[OK] 索引更新：重新索引 {updated} 个，未变化 {skipped} 个，删除 {removed} 个，{time.perf_counter() - t0:.2f} s",
+            file=sys.stderr,
+        )
+        return 0
+
+    column: Optional[str] = None
+    func: Optional[int] = None
+    limit = 50
+    rest: List[str] = []
+    it = iter(args[1:])
+    for a in it:
+        if a in {"--in", "--func", "--limit"}:
+            v = next(it, None)
+            if v is None:
+                print(f"{a} 缺少参数", file=sys.stderr)
+                return 2
+            if a == "--in":
+                if v not in _FTS_COLUMNS:
+                    print(f"--in 只能是 {'/'.join(_FTS_COLUMNS)}", file=sys.stderr)
+                    return 2
+                column = v
+            elif a == "--func":
+                func = int(v, 16)
+            else:
+                limit = int(v, 10)
+        else:
+            rest.append(a)
+    if len(rest) != 2:
+        print(_USAGE, file=sys.stderr)
+        return 2
+    return cmd_query(Path(rest[0]), rest[1], column, func, limit)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
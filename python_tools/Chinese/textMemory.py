@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 翻译记忆：系统提示、固定反应、选项等同一句原文会散落在很多 JSON 里。
+# 以归一化后的 original 为键建哈希表（original -> translation），一次把所有 JSON 里空着的 translation 补上，
+# 并报告命中率。记忆库是普通 JSON 文件，可以跨批次 / 跨目录复用。
+
+import json
+import re
+import sys
+import time
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from textJson import iter_json_files
+
+TM_FORMAT = 1
+
+# (JSON 路径, 条目列表)；fill 先收集再补全，同一批文件只解析一次
+JsonDoc = Tuple[Path, list]
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_original(s: str) -> str:
+    # 全角/半角统一（NFKC），去首尾空白，连续空白（含换行，以及 JSON 里转义写法的 \n）压成一个空格
+    s = s.replace("\r\n", "\n").replace("\r", "\n").replace("\\n", "\n")
+    s = unicodedata.normalize("NFKC", s)
+    return _WS_RE.sub(" ", s).strip()
+
+
+@dataclass
+class FillReport:
+    files: int = 0             # 扫描的 JSON 数
+    files_changed: int = 0     # 有条目被补上的 JSON 数
+    entries: int = 0           # 全部条目
+    empty: int = 0             # translation 为空的条目
+    filled: int = 0            # 其中由记忆补上的
+    conflicts: int = 0         # 同一原文出现多个不同译文（取出现次数最多的）
+    missing: Counter = field(default_factory=Counter)  # 未命中的原文 -> 出现次数
+
+    @property
+    def hit_rate(self) -> float:
+        return self.filled / self.empty if self.empty else 0.0
+
+
+class TranslationMemory:
+    def __init__(self) -> None:
+        # 归一化原文 -> {译文: 出现次数}
+        self.votes: Dict[str, Counter] = {}
+        self._best: Optional[Dict[str, str]] = None
+
+    def __len__(self) -> int:
+        return len(self.votes)
+
+    def add(self, original: str, translation: str, count: int = 1) -> None:
+        if not original or not translation:
+            return
+        key = normalize_original(original)
+        if not key:
+            return
+        self.votes.setdefault(key, Counter())[translation] += count
+        self._best = None
+
+    def _table(self) -> Dict[str, str]:
+        if self._best is None:
+            # 票数相同按先加入的译文（Counter 保持插入顺序，most_common 稳定）
+            self._best = {k: c.most_common(1)[0][0] for k, c in self.votes.items()}
+        return self._best
+
+    def lookup(self, original: str) -> Optional[str]:
+        return self._table().get(normalize_original(original))
+
+    def conflicts(self) -> int:
+        return sum(1 for c in self.votes.values() if len(c) > 1)
+
+    def harvest(self, json_dir: Path) -> int:
+        # 收集目录下所有已翻译条目，返回收集的条数
+        return self.harvest_docs(_iter_items(json_dir))
+
+    def harvest_docs(self, docs: Iterable[JsonDoc]) -> int:
+        n = 0
+        for _, items in docs:
+            for it in items:
+                if not isinstance(it, dict):
+                    continue
+                orig, tr = it.get("original"), it.get("translation")
+                if isinstance(orig, str) and isinstance(tr, str) and tr:
+                    self.add(orig, tr)
+                    n += 1
+        return n
+
+    def save(self, path: Path) -> None:
+        data = {
+            "format": TM_FORMAT,
+            "entries": {k: dict(c) for k, c in sorted(self.votes.items())},
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path) -> "TranslationMemory":
+        tm = cls()
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if not isinstance(data, dict) or data.get("format") != TM_FORMAT:
+            raise ValueError(f"不是翻译记忆文件（或版本不符）：{path}")
+        for k, trs in data.get("entries", {}).items():
+            if isinstance(trs, dict):
+                for tr, cnt in trs.items():
+                    if isinstance(tr, str) and isinstance(cnt, int):
+                        tm.add(k, tr, cnt)
+        return tm
+
+
+def _iter_items(json_dir: Path) -> Iterator[JsonDoc]:
+    for jp in iter_json_files(json_dir):
+        try:
+            items = json.loads(jp.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"[WARN] 跳过无法读取的 JSON：{jp}（{e}）", file=sys.stderr)
+            continue
+        if isinstance(items, list):
+            yield jp, items
+
+
+def fill_dir(
+    json_dir: Path,
+    tm: TranslationMemory,
+    *,
+    dry_run: bool = False,
+    docs: Optional[Sequence[JsonDoc]] = None,
+) -> FillReport:
+    # 用记忆补全 json_dir 下所有空 translation；只重写真正有改动的文件，格式与 textJson.py d 输出一致。
+    # 补上的条目同时置 stage = 1，demo.py 写回时才会用 translation（textJson.py e/ea 不看 stage）。
+    # docs：已解析好的 _iter_items(json_dir) 结果，传入则不再重读文件
+    rep = FillReport(conflicts=tm.conflicts())
+    for jp, items in (docs if docs is not None else _iter_items(json_dir)):
+        rep.files += 1
+        changed = False
+        for it in items:
+            if not isinstance(it, dict):
+                continue
+            orig = it.get("original")
+            if not isinstance(orig, str):
+                continue
+            rep.entries += 1
+            if it.get("translation"):
+                continue
+            rep.empty += 1
+            tr = tm.lookup(orig)
+            if tr is None:
+                rep.missing[normalize_original(orig)] += 1
+                continue
+            it["translation"] = tr
+            it["stage"] = 1
+            rep.filled += 1
+            changed = True
+        if changed:
+            rep.files_changed += 1
+            if not dry_run:
+                jp.write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
+    return rep
+
+
+def _print_report(rep: FillReport, top: int, elapsed: float, dry_run: bool) -> None:
+    act = "可补" if dry_run else "已补"
+    print(
+        f"[OK] {rep.files} 个 JSON，{rep.entries} 条；空译文 {rep.empty} 条，{act} {rep.filled} 条"
+        f"（命中率 {rep.hit_rate * 100:.1f}%），改动 {rep.files_changed} 个文件，"
+        f"记忆库冲突 {rep.conflicts} 句，{elapsed:.2f} s",
+        file=sys.stderr,
+    )
+    # 未命中里重复最多的原文：先翻这些收益最大
+    dups = [(orig, n) for orig, n in rep.missing.most_common(top) if n >= 2] if top > 0 else []
+    if dups:
+        print(f"未命中且重复最多的原文（前 {len(dups)}）：", file=sys.stderr)
+        for orig, n in dups:
+            print(f"  {n:5d}  {orig}", file=sys.stderr)
+
+
+_USAGE = (
+    "用法：\n"
+    "  从已翻译的 JSON 建立/更新记忆库：\n"
+    "    python textMemory.py build <json目录> <记忆库.json> [--merge]\n"
+    "      --merge：在已有记忆库上累加，否则重建\n"
+    "\n"
+    "  用记忆补全空译文（同时收集 json目录 自身已有的译文，同句只需翻译一次）：\n"
+    "    python textMemory.py fill <json目录> [记忆库.json] [--dry-run] [--top N]\n"
+    "      --dry-run：只统计命中率，不写文件；--top N：列出未命中且重复最多的 N 句（默认 20）\n"
+)
+
+
+def main(argv: Sequence[str]) -> int:
+    args: List[str] = []
+    dry_run = False
+    merge = False
+    top = 20
+    it = iter(argv[1:])
+    for a in it:
+        if a == "--dry-run":
+            dry_run = True
+        elif a == "--merge":
+            merge = True
+        elif a == "--top":
+            v = next(it, None)
+            if v is None:
+                print("--top 缺少参数", file=sys.stderr)
+                return 2
+            top = int(v, 10)
+        else:
+            args.append(a)
+
+    if len(args) < 2 or args[0] not in {"build", "fill"}:
+        print(_USAGE, file=sys.stderr)
+        return 2
+
+    t0 = time.perf_counter()
+    if args[0] == "build":
+        if len(args) != 3:
+            print(_USAGE, file=sys.stderr)
+            return 2
+        tm_path = Path(args[2])
+        tm = TranslationMemory.load(tm_path) if merge and tm_path.exists() else TranslationMemory()
+        n = tm.harvest(Path(args[1]))
+        tm.save(tm_path)
+        print(
+            f"[OK] 收集 {n} 条译文，记忆库 {len(tm)} 句（冲突 {tm.conflicts()} 句），{time.perf_counter() - t0:.2f} s",
+            file=sys.stderr,
+        )
+        return 0
+
+    if len(args) > 3:
+        print(_USAGE, file=sys.stderr)
+        return 2
+    json_dir = Path(args[1])
+    tm = TranslationMemory.load(Path(args[2])) if len(args) == 3 else TranslationMemory()
+    docs = list(_iter_items(json_dir))
+    tm.harvest_docs(docs)
+    rep = fill_dir(json_dir, tm, dry_run=dry_run, docs=docs)
+    _print_report(rep, top, time.perf_counter() - t0, dry_run)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 译文参考：很多台词只差一个名字或句尾语气词。对 JSON 树（textJson / tbl / demo / roll 的输出）里所有已翻译条目的
+# original 建字符 n-gram 倒排索引（SQLite），给一句原文直接按共有 n-gram 数找出最相似的 top-k 条已有译文，
+# 不做逐条编辑距离。相似度是 n-gram 集合的 Dice 系数。索引按文件 mtime/大小/sha1 增量更新。
+
+import hashlib
+import json
+import math
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Sequence, Set, Tuple
+
+from textJson import iter_json_files
+from textMemory import normalize_original
+
+NGRAM = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    k TEXT PRIMARY KEY,
+    v TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha1 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    key TEXT NOT NULL,
+    original TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    ngrams INTEGER NOT NULL     -- original 的 n-gram 集合大小
+);
+CREATE INDEX IF NOT EXISTS docs_path ON docs(path);
+CREATE TABLE IF NOT EXISTS grams (
+    gram TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    PRIMARY KEY (gram, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS grams_doc ON grams(doc);
+"""
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    score: float        # Dice 系数，0~1
+    original: str
+    translation: str
+    path: str
+    key: str
+
+
+def ngrams(text: str, n: int = NGRAM) -> Set[str]:
+    # 归一化规则与 textMemory 相同；比 n 短的文本整体作为一个 gram
+    s = normalize_original(text)
+    if len(s) <= n:
+        return {s} if s else set()
+    return {s[i:i + n] for i in range(len(s) - n + 1)}
+
+
+def open_index(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript(_SCHEMA)
+    row = conn.execute("SELECT v FROM meta WHERE k = 'ngram'").fetchone()
+    if row is None:
+        conn.execute("INSERT INTO meta(k, v) VALUES('ngram', ?)", (str(NGRAM),))
+    elif row[0] != str(NGRAM):
+        raise ValueError(f"索引用的是 {row[0]}-gram，当前为 {NGRAM}-gram，请删除 {db_path} 后重建")
+    return conn
+
+
+def _delete_file(conn: sqlite3.Connection, path: str) -> None:
+    conn.execute("DELETE FROM grams WHERE doc IN (SELECT id FROM docs WHERE path = ?)", (path,))
+    conn.execute("DELETE FROM docs WHERE path = ?", (path,))
+    conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+
+def _insert_file(conn: sqlite3.Connection, path: str, items: Any) -> int:
+    # 只收已翻译的条目：没有译文的条目给不出参考
+    if not isinstance(items, list):
+        return 0
+    n = 0
+    for it in items:
+        if not isinstance(it, dict):
+            continue
+        orig, tr = it.get("original"), it.get("translation")
+        if not isinstance(orig, str) or not isinstance(tr, str) or not tr:
+            continue
+        grams = ngrams(orig)
+        if not grams:
+            continue
+        key = it.get("key") if isinstance(it.get("key"), str) else ""
+        cur = conn.execute(
+            "INSERT INTO docs(path, key, original, translation, ngrams) VALUES(?, ?, ?, ?, ?)",
+            (path, key, orig, tr, len(grams)),
+        )
+        doc = cur.lastrowid
+        conn.executemany("INSERT INTO grams(gram, doc) VALUES(?, ?)", ((g, doc) for g in grams))
+        n += 1
+    return n
+
+
+def update_index(conn: sqlite3.Connection, roots: Sequence[Path]) -> Tuple[int, int, int]:
+    # 返回 (重新索引的文件数, 未变化跳过的文件数, 删除的文件数)
+    known = {row[0]: row[1:] for row in conn.execute("SELECT path, mtime_ns, size, sha1 FROM files")}
+    seen: Set[str] = set()
+    updated = skipped = 0
+    for root in roots:
+        for jp in iter_json_files(root):
+            # 以绝对路径为键：同一棵树用相对 / 绝对路径、或从不同 cwd 建索引都对应同一批文档。
+            # 旧索引里按相对路径记的条目在这次更新里视为已删除，对应文件按绝对路径重新索引一次
+            path = jp.resolve().as_posix()
+            seen.add(path)
+            st = jp.stat()
+            old = known.get(path)
+            if old is not None and old[0] == st.st_mtime_ns and old[1] == st.st_size:
+                skipped += 1
+                continue
+
+            data = jp.read_bytes()
+            sha1 = hashlib.sha1(data).hexdigest()
+            if old is not None and old[2] == sha1:
+                conn.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?", (st.st_mtime_ns, st.st_size, path))
+                skipped += 1
+                continue
+
+            try:
+                items = json.loads(data.decode("utf-8", errors="ignore"))
+            except ValueError:
+                items = None
+            _delete_file(conn, path)
+            _insert_file(conn, path, items)
+            conn.execute(
+                "INSERT INTO files(path, mtime_ns, size, sha1) VALUES(?, ?, ?, ?)",
+                (path, st.st_mtime_ns, st.st_size, sha1),
+            )
+            updated += 1
+
+    removed = [p for p in known if p not in seen]
+    for path in removed:
+        _delete_file(conn, path)
+    conn.commit()
+    return updated, skipped, len(removed)
+
+
+def suggest(conn: sqlite3.Connection, text: str, k: int = 5, min_score: float = 0.3) -> List[Suggestion]:
+    # Dice = 2·共有 / (|A| + |B|) ≥ t 时共有数至少 ceil(t·|A| / (2 - t))，用 HAVING 先筛掉
+    grams = sorted(ngrams(text))
+    if not grams:
+        return []
+    qn = len(grams)
+    min_shared = max(1, math.ceil(min_score * qn / (2 - min_score) - 1e-9))
+    marks = ",".join("?" * qn)
+    sql = (
+        "SELECT d.original, d.translation, d.path, d.key, 2.0 * s.shared / (? + d.ngrams) AS score "
+        f"FROM (SELECT doc, COUNT(*) AS shared FROM grams WHERE gram IN ({marks}) GROUP BY doc HAVING shared >= ?) s "
+        "JOIN docs d ON d.id = s.doc "
+        "WHERE 2.0 * s.shared / (? + d.ngrams) >= ? "
+        "ORDER BY score DESC, d.id LIMIT ?"
+    )
+    # 同一原文 + 译文在很多文件里重复出现时只留一条，多取一些再去重
+    rows = conn.execute(sql, (qn, *grams, min_shared, qn, min_score, k * 4)).fetchall()
+    out: List[Suggestion] = []
+    seen: Set[Tuple[str, str]] = set()
+    for orig, tr, path, key, score in rows:
+        if (orig, tr) in seen:
+            continue
+        seen.add((orig, tr))
+        out.append(Suggestion(score, orig, tr, path, key))
+        if len(out) >= k:
+            break
+    return out
+
+
+def _one_line(s: str) -> str:
+    return s.replace("\r", "").replace("\n", "\\n")
+
+
+_USAGE = (
+    "用法：\n"
+    "  建立/增量更新索引（可给多个 JSON 目录，如剧情、tbl、demo、roll 的输出）：\n"
+    "    python textSuggest.py build <索引.db> <json目录> [json目录...]\n"
+    "      每次给出全部目录：不在这些目录下的文件会从索引里删掉\n"
+    "\n"
+    "  查相似原文的已有译文：\n"
+    "    python textSuggest.py q <索引.db> <原文> [--top K] [--min 0.3]\n"
+)
+
+
+def main(argv: Sequence[str]) -> int:
+    args: List[str] = []
+    top = 5
+    min_score = 0.3
+    it = iter(argv[1:])
+    for a in it:
+        if a in {"--top", "--min"}:
+            v = next(it, None)
+            if v is None:
+                print(f"{a} 缺少参数", file=sys.stderr)
+                return 2
+            if a == "--top":
+                top = int(v, 10)
+            else:
+                min_score = float(v)
+        else:
+            args.append(a)
+
+    if len(args) < 3 or args[0] not in {"build", "q"}:
+        print(_USAGE, file=sys.stderr)
+        return 2
+
+    t0 = time.perf_counter()
+    conn = open_index(Path(args[1]))
+    try:
+        if args[0] == "build":
+            updated, skipped, removed = update_index(conn, [Path(a) for a in args[2:]])
+            docs = conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+            print(
+                f"[OK] 索引更新：重新索引 {updated} 个，未变化 {skipped} 个，删除 {removed} 个；"
+                f"共 {docs} 条已翻译原文，{time.perf_counter() - t0:.2f} s",
+                file=sys.stderr,
+            )
+            return 0
+
+        if len(args) != 3:
+            print(_USAGE, file=sys.stderr)
+            return 2
+        t0 = time.perf_counter()
+        res = suggest(conn, args[2], k=top, min_score=min_score)
+        elapsed = time.perf_counter() - t0
+    finally:
+        conn.close()
+
+    for s in res:
+        print(f"{s.score:.2f}\t{s.path}\t{s.key}")
+        print(f"    原文: {_one_line(s.original)}")
+        print(f"    译文: {_one_line(s.translation)}")
+    print(f"[OK] {len(res)} 条，{elapsed * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -1,8 +1,18 @@
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import os
 import re
+import struct
 import sys
-from dataclasses import dataclass
+import time
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, TextIO, Tuple, Union
 
 _EMBEDDED_STR_JSON = {
     "CALLB": {
@@ -14,6 +24,16 @@ _EMBEDDED_STR_JSON = {
 }
 
 _HEX_TOKEN_RE = re.compile(r"^(?:0[xX])?[0-9a-fA-F]+$")
+_CSTRING_RE = re.compile(rb"[^\x00]+")
+_CSTRING_AT_RE = re.compile(rb"[^\x00]*")
+
+_U32 = struct.Struct("<I")
+_HEADER_U32S = struct.Struct("<8I")  # 0x24..0x44
+_ENTRY = struct.Struct("<5I")
+
+# 解析全程只在原始文件 buffer 上按偏移读取（memoryview / struct.unpack_from），
+# 只有真正解码文本时才会切出 bytes
+Buffer = Union[bytes, bytearray, memoryview]
 
 
 @dataclass(frozen=True)
@@ -79,7 +99,7 @@ if _EMBEDDED_OPCODES:
         _OPCODE_TABLE[_i] = _EMBEDDED_OPCODES.get(_i, OpcodeDef("NOP", 1))
 
 
-def _u32_le(b: bytes) -> int:
+def _u32_le(b: Buffer) -> int:
     return int.from_bytes(b, "little", signed=False)
 
 
@@ -164,8 +184,8 @@ def parse_hex_int(token: str) -> int:
     return int(t, 0) if t.lower().startswith("0x") else int(t, 16)
 
 
-def _read_u32_at(buf: bytes, off: int) -> int:
-    return _u32_le(buf[off : off + 4])
+def _read_u32_at(buf: Buffer, off: int) -> int:
+    return _U32.unpack_from(buf, off)[0]
 
 
 @dataclass(frozen=True)
@@ -193,21 +213,23 @@ class AsbEntry:
     name: str
 
 
-def parse_asb_header(file_bytes: bytes) -> AsbHeader:
+def parse_asb_header(file_bytes: Buffer) -> AsbHeader:
     if len(file_bytes) < 0x44:
         raise ValueError("文件太小，无法解析 ASB 头")
 
-    raw_name = file_bytes[0x04:0x14]
+    raw_name = bytes(file_bytes[0x04:0x14])
     filename = raw_name.split(b"\x00", 1)[0].decode("ascii", errors="ignore")
 
-    entry_table_off = _read_u32_at(file_bytes, 0x24)
-    entry_count = _read_u32_at(file_bytes, 0x28)
-    code_off = _read_u32_at(file_bytes, 0x2C)
-    code_size = _read_u32_at(file_bytes, 0x30)
-    str1_off = _read_u32_at(file_bytes, 0x34)
-    str1_size = _read_u32_at(file_bytes, 0x38)
-    str2_off = _read_u32_at(file_bytes, 0x3C)
-    str2_size = _read_u32_at(file_bytes, 0x40)
+    (
+        entry_table_off,
+        entry_count,
+        code_off,
+        code_size,
+        str1_off,
+        str1_size,
+        str2_off,
+        str2_size,
+    ) = _HEADER_U32S.unpack_from(file_bytes, 0x24)
 
     return AsbHeader(
         filename=filename,
@@ -222,45 +244,35 @@ def parse_asb_header(file_bytes: bytes) -> AsbHeader:
     )
 
 
-def _slice_region(file_bytes: bytes, start: int, size: int) -> bytes:
-    if size <= 0:
-        return b""
-    if start < 0 or start >= len(file_bytes):
-        return b""
-    end = start + size
-    if end > len(file_bytes):
-        end = len(file_bytes)
-    if end <= start:
-        return b""
-    return file_bytes[start:end]
+def _region_bounds(total: int, start: int, size: int) -> Tuple[int, int]:
+    # 越界/空区域统一返回空区间；超出文件尾的部分截断
+    if size <= 0 or start < 0 or start >= total:
+        return 0, 0
+    return start, min(start + size, total)
 
 
-def _read_cstring(region: bytes, off: int) -> bytes:
+def _slice_region(file_bytes: Buffer, start: int, size: int) -> memoryview:
+    view = memoryview(file_bytes)
+    lo, hi = _region_bounds(len(view), start, size)
+    return view[lo:hi]
+
+
+def _read_cstring(region: Buffer, off: int) -> bytes:
     if off < 0 or off >= len(region):
         return b""
-    end = region.find(b"\x00", off)
-    if end == -1:
-        end = len(region)
-    return region[off:end]
+    m = _CSTRING_AT_RE.match(region, off)
+    return m.group(0) if m else b""
 
 
-def parse_entry_table(header: AsbHeader, file_bytes: bytes) -> List[AsbEntry]:
+def parse_entry_table(header: AsbHeader, file_bytes: Buffer) -> List[AsbEntry]:
     str1 = _slice_region(file_bytes, header.str1_off, header.str1_size)
     table = _slice_region(file_bytes, header.entry_table_off, header.entry_count * 20)
 
     entries: List[AsbEntry] = []
-    for i in range(header.entry_count):
-        chunk = table[i * 20 : (i + 1) * 20]
-        if len(chunk) < 20:
-            break
-
-        name_off = _u32_le(chunk[0x00:0x04])
-        unk04 = _u32_le(chunk[0x04:0x08])
-        split = _u32_le(chunk[0x08:0x0C])
+    for i in range(min(header.entry_count, len(table) // 20)):
+        name_off, unk04, split, flag0c, unk10 = _ENTRY.unpack_from(table, i * 20)
         locals_count = split & 0xFFFF
         param_count = (split >> 16) & 0xFFFF
-        flag0c = _u32_le(chunk[0x0C:0x10])
-        unk10 = _u32_le(chunk[0x10:0x14])
         name = decode_text(_read_cstring(str1, name_off))
 
         entries.append(
@@ -279,12 +291,158 @@ def parse_entry_table(header: AsbHeader, file_bytes: bytes) -> List[AsbEntry]:
     return entries
 
 
-@dataclass
+OperandFormatter = Callable[[Tuple[int, ...]], List[str]]
+
+
+def _fmt_operands_none(v: Tuple[int, ...]) -> List[str]:
+    return []
+
+
+def _fmt_operands_u8(v: Tuple[int, ...]) -> List[str]:
+    return [fmt_u8(v[0])]
+
+
+def _fmt_operands_u32(v: Tuple[int, ...]) -> List[str]:
+    return [fmt_u32(v[0])]
+
+
+def _fmt_operands_call(v: Tuple[int, ...]) -> List[str]:
+    # 输出顺序：argcount(byte), function_id(imm32)
+    return [fmt_u8(v[1]), fmt_u32(v[0])]
+
+
+def _fmt_operands_u32x2(v: Tuple[int, ...]) -> List[str]:
+    return [fmt_u32(v[0]), fmt_u32(v[1])]
+
+
+def _fmt_operands_u32x2_u8(v: Tuple[int, ...]) -> List[str]:
+    return [fmt_u32(v[0]), fmt_u32(v[1]), fmt_u8(v[2])]
+
+
+def _fmt_operands_btbl(v: Tuple[int, ...]) -> List[str]:
+    return [fmt_u8(v[0])] + [fmt_u32(x) for x in v[1:]]
+
+
+def _fmt_operands_bytes(v: Tuple[int, ...]) -> List[str]:
+    return [fmt_u8(x) for x in v]
+
+
+# 操作数字节数 -> (struct 格式, 文本格式化)；其它长度按逐字节处理
+_OPERAND_LAYOUTS: Dict[int, Tuple[str, OperandFormatter]] = {
+    0: ("<", _fmt_operands_none),
+    1: ("<B", _fmt_operands_u8),
+    4: ("<I", _fmt_operands_u32),
+    5: ("<IB", _fmt_operands_call),
+    8: ("<II", _fmt_operands_u32x2),
+    9: ("<IIB", _fmt_operands_u32x2_u8),
+}
+
+
+@dataclass(frozen=True)
+class OperandCodec:
+    size: int  # 操作数字节数（不含 opcode）；-1 表示 BTBL 变长
+    unpacker: Optional[struct.Struct]
+    fmt: OperandFormatter
+
+
+def compile_operand_codecs(opcode_table: Sequence[OpcodeDef]) -> List[OperandCodec]:
+    codecs: List[OperandCodec] = []
+    for op_def in opcode_table:
+        if op_def.total_size == -1:
+            codecs.append(OperandCodec(size=-1, unpacker=None, fmt=_fmt_operands_btbl))
+            continue
+        size = max(op_def.total_size - 1, 0)
+        layout, fmt = _OPERAND_LAYOUTS.get(size, (f"<{size}B", _fmt_operands_bytes))
+        codecs.append(OperandCodec(size=size, unpacker=struct.Struct(layout), fmt=fmt))
+    return codecs
+
+
+_OPERAND_CODECS: List[OperandCodec] = compile_operand_codecs(_OPCODE_TABLE)
+
+# (opcode, pc, 操作数原始整数)；pc 为 opcode 字节相对代码区起点的偏移
+RawInsn = Tuple[int, int, Tuple[int, ...]]
+
+
+def decode_code_raw(
+    code: Buffer,
+    opcode_table: Sequence[OpcodeDef] = _OPCODE_TABLE,
+    *,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> List[RawInsn]:
+    codecs = _OPERAND_CODECS if opcode_table is _OPCODE_TABLE else compile_operand_codecs(opcode_table)
+    n_ops = len(codecs)
+    pc = start
+    code_end = len(code) if end is None else end
+    out: List[RawInsn] = []
+    append = out.append
+
+    while pc < code_end:
+        op_pc = pc - start
+        opcode = code[pc]
+        pc += 1
+
+        if opcode >= n_ops:
+            continue
+
+        codec = codecs[opcode]
+        if codec.unpacker is None:
+            if pc >= code_end:
+                break
+            count = code[pc]
+            if pc + 1 + count * 4 > code_end:
+                break
+            append((opcode, op_pc, (count,) + struct.unpack_from(f"<{count}I", code, pc + 1)))
+            pc += 1 + count * 4
+            continue
+
+        if pc + codec.size > code_end:
+            break
+        append((opcode, op_pc, codec.unpacker.unpack_from(code, pc)))
+        pc += codec.size
+
+    return out
+
+
 class VmInsn:
-    name: str
-    operand_bytes: bytes
-    operands: List[str]
-    text_only: bool = False  # 用于把 PUSHI 字符串参数直接输出为一行纯文本
+    # 操作数保存为原始整数，文本只在真正需要时（写 txt / 被字符串替换）才生成
+    __slots__ = ("name", "opcode", "pc", "values", "text_only", "_codec", "_operands")
+
+    def __init__(
+        self,
+        name: str,
+        opcode: int,
+        pc: int,
+        values: Tuple[int, ...],
+        codec: OperandCodec,
+        text_only: bool = False,  # 用于把 PUSHI 字符串参数直接输出为一行纯文本
+    ):
+        self.name = name
+        self.opcode = opcode
+        self.pc = pc
+        self.values = values
+        self.text_only = text_only
+        self._codec = codec
+        self._operands: Optional[List[str]] = None
+
+    @property
+    def operands(self) -> List[str]:
+        if self._operands is None:
+            self._operands = self._codec.fmt(self.values)
+        return self._operands
+
+    @operands.setter
+    def operands(self, value: List[str]) -> None:
+        self._operands = value
+
+    @property
+    def operand_bytes(self) -> bytes:
+        if self._codec.unpacker is None:
+            return _pack_u8(self.values[0]) + struct.pack(f"<{len(self.values) - 1}I", *self.values[1:])
+        return self._codec.unpacker.pack(*self.values)
+
+    def __repr__(self) -> str:
+        return f"VmInsn({self.name!r}, pc={self.pc:#x}, values={self.values!r})"
 
 
 @dataclass(frozen=True)
@@ -295,21 +453,18 @@ class CStringInfo:
 
 
 class CStringIndex:
-    def __init__(self, region: bytes):
+    def __init__(self, region: Buffer):
         self._region = region
         self._items: List[CStringInfo] = []
-        i = 0
-        while i < len(region):
-            if region[i] == 0:
-                i += 1
-                continue
-            start = i
-            end = region.find(b"\x00", start)
-            if end == -1:
-                end = len(region)
-            raw = region[start:end]
-            self._items.append(CStringInfo(start=start, end=end, text=decode_text(raw)))
-            i = end + 1
+        # 每个非空的 \0 结尾字符串；末尾没有 \0 的算到 region 结尾
+        for m in _CSTRING_RE.finditer(region):
+            start, end = m.span()
+            self._items.append(CStringInfo(start=start, end=end, text=decode_text(m.group(0))))
+        # 按起始偏移升序（扫描顺序即有序）：精确命中走 dict，落在字符串中间的指针走二分
+        self._starts: List[int] = [it.start for it in self._items]
+        self._by_start: Dict[int, CStringInfo] = {it.start: it for it in self._items}
+        # 指向字符串中间的指针（尾部共享）解析出的后缀，按偏移缓存
+        self._suffixes: Dict[int, CStringInfo] = {}
 
     @property
     def items(self) -> Sequence[CStringInfo]:
@@ -318,77 +473,91 @@ class CStringIndex:
     def resolve(self, off: int) -> Optional[CStringInfo]:
         if off < 0 or off >= len(self._region):
             return None
-        for it in self._items:
-            if it.start <= off <= it.end:
-                return it
-        return None
+        it = self._by_start.get(off)
+        if it is not None:
+            return it
+        k = bisect_right(self._starts, off) - 1
+        if k < 0:
+            return None
+        it = self._items[k]
+        if off > it.end:
+            return None
+        if off == it.end:
+            # 指向结尾 \0 的指针沿用原来的解析：整条字符串
+            return it
+        # 落在字符串中间：游戏读到的是从 off 开始的后缀（--pack-strings 的共享尾部就是这样），不是整条
+        suffix = self._suffixes.get(off)
+        if suffix is None:
+            suffix = CStringInfo(start=off, end=it.end, text=decode_text(bytes(self._region[off:it.end])))
+            self._suffixes[off] = suffix
+        return suffix
+
+
+def parse_code(code: Buffer, opcode_table: List[OpcodeDef], *, start: int = 0, end: Optional[int] = None) -> List[VmInsn]:
+    # start/end 允许直接在整个文件 buffer 上解析代码区，不必先切出一份 code 拷贝
+    codecs = _OPERAND_CODECS if opcode_table is _OPCODE_TABLE else compile_operand_codecs(opcode_table)
+    return [
+        VmInsn(opcode_table[opcode].name, opcode, pc, values, codecs[opcode])
+        for opcode, pc, values in decode_code_raw(code, opcode_table, start=start, end=end)
+    ]
 
 
-def _format_operand_list(raw: bytes) -> List[str]:
-    if not raw:
-        return []
-    if len(raw) == 1:
-        return [fmt_u8(raw[0])]
-    if len(raw) == 4:
-        return [fmt_u32(_u32_le(raw))]
-    if len(raw) == 5:
-        # 输出顺序：argcount(byte), function_id(imm32)
-        return [fmt_u8(raw[4]), fmt_u32(_u32_le(raw[:4]))]
-    if len(raw) == 8:
-        return [fmt_u32(_u32_le(raw[:4])), fmt_u32(_u32_le(raw[4:]))]
-    if len(raw) == 9:
-        return [fmt_u32(_u32_le(raw[:4])), fmt_u32(_u32_le(raw[4:8])), fmt_u8(raw[8])]
-    return [fmt_u8(x) for x in raw]
-
-
-def parse_code(code: bytes, opcode_table: List[OpcodeDef]) -> List[VmInsn]:
-    pc = 0
-    out: List[VmInsn] = []
-
-    while pc < len(code):
-        opcode = code[pc]
-        pc += 1
+def _call_argcount(insn: VmInsn) -> Optional[int]:
+    v = insn.values
+    if insn.name in {"CALLB", "CALLL"} and len(v) == 2:
+        return v[1]
+    if insn.operands:
+        try:
+            return parse_hex_int(insn.operands[0])
+        except Exception:
+            return None
+    return None
 
-        if opcode >= len(opcode_table):
-            continue
 
-        op_def = opcode_table[opcode]
-        op_name = op_def.name
+PUSH_OPCODES = frozenset({"PUSHI", "PUSHL", "PUSHG", "PUSHF", "PUSHR"})
 
-        if op_def.total_size == -1:
-            if pc >= len(code):
-                break
-            count = code[pc]
-            pc += 1
-            need = count * 4
-            if pc + need > len(code):
-                break
-            raw = bytes([count]) + code[pc : pc + need]
-            pc += need
-            operands = [fmt_u8(count)] + [fmt_u32(_u32_le(raw[1 + i * 4 : 1 + i * 4 + 4])) for i in range(count)]
-        else:
-            operand_len = max(op_def.total_size - 1, 0)
-            if pc + operand_len > len(code):
-                break
-            raw = code[pc : pc + operand_len]
-            pc += operand_len
-            operands = _format_operand_list(raw)
 
-        out.append(VmInsn(name=op_name, operand_bytes=raw, operands=operands))
+def push_run_starts(names: Iterable[str]) -> List[int]:
+    # 一次正向扫描：run_start[i] 是紧挨在指令 i 之前那段连续 PUSH* 的第一个下标（前面不是 PUSH 就等于 i）。
+    # 指令 i 的参数就是 insns[run_start[i]:i]，不用每次从 CALL 往回走
+    run_start: List[int] = []
+    start = 0
+    prev_push = False
+    for i, name in enumerate(names):
+        if not prev_push:
+            start = i
+        run_start.append(start)
+        prev_push = name in PUSH_OPCODES
+    return run_start
 
-    return out
 
+@dataclass(frozen=True)
+class CallArgSpan:
+    # 一条 CALLB/CALLL 和它前面的参数段：参数是 insns[start:call]，arg(1) 是最先压栈的那个
+    call: int
+    name: str
+    start: int
 
-def _call_argcount(insn: VmInsn) -> Optional[int]:
-    b = insn.operand_bytes
-    if insn.name in {"CALLB", "CALLL"} and len(b) == 5:
-        return b[4]
-    if insn.operands:
-        try:
-            return parse_hex_int(insn.operands[0])
-        except Exception:
+    @property
+    def argc(self) -> int:
+        return self.call - self.start
+
+    def arg(self, pos: int) -> Optional[int]:
+        # pos 从 1 开始；超出范围返回 None
+        if pos <= 0 or pos > self.call - self.start:
             return None
-    return None
+        return self.start + pos - 1
+
+
+def call_arg_spans(insns: Sequence[VmInsn], run_start: Optional[Sequence[int]] = None) -> Dict[int, CallArgSpan]:
+    # 指令下标 -> CallArgSpan，只收 CALLB/CALLL；必须在 apply_string_mappings 改名之前建
+    if run_start is None:
+        run_start = push_run_starts(insn.name for insn in insns)
+    return {
+        i: CallArgSpan(call=i, name=insn.name, start=run_start[i])
+        for i, insn in enumerate(insns)
+        if insn.name in {"CALLB", "CALLL"}
+    }
 
 
 def apply_string_mappings(
@@ -406,10 +575,12 @@ def apply_string_mappings(
         if it:
             used_str1.add(it.start)
 
+    # 映射过程中 PUSHI 会被改成文本行，所以参数段要在改之前一次建好
+    spans = call_arg_spans(insns)
+
     for i, insn in enumerate(insns):
-        if insn.name == "JMPG" and len(insn.operand_bytes) == 8:
-            off2 = _u32_le(insn.operand_bytes[:4])
-            off1 = _u32_le(insn.operand_bytes[4:])
+        if insn.name == "JMPG" and len(insn.values) == 2:
+            off2, off1 = insn.values
             s2 = str2_index.resolve(off2)
             s1 = str1_index.resolve(off1)
             if s2:
@@ -421,10 +592,8 @@ def apply_string_mappings(
             insn.operands = [a, b]
             continue
 
-        if insn.name == "CALLG" and len(insn.operand_bytes) == 9:
-            off2 = _u32_le(insn.operand_bytes[:4])
-            off1 = _u32_le(insn.operand_bytes[4:8])
-            argc = insn.operand_bytes[8]
+        if insn.name == "CALLG" and len(insn.values) == 3:
+            off2, off1, argc = insn.values
             s2 = str2_index.resolve(off2)
             s1 = str1_index.resolve(off1)
             if s2:
@@ -441,7 +610,7 @@ def apply_string_mappings(
             continue
 
         if insn.name in {"CALLB", "CALLL"}:
-            func_id = _u32_le(insn.operand_bytes[:4]) if len(insn.operand_bytes) >= 4 else None
+            func_id = insn.values[0] if len(insn.values) == 2 else None
             if func_id is None:
                 continue
 
@@ -451,31 +620,23 @@ def apply_string_mappings(
             argcount = _call_argcount(insn)
             positions = table[func_id]
 
-            arg_idxs_rev: List[int] = []
-            for j in range(i - 1, -1, -1):
-                nm = insns[j].name
-                if nm in {"PUSHI", "PUSHL", "PUSHG", "PUSHF", "PUSHR"}:
-                    arg_idxs_rev.append(j)
-                    continue
-                break
-            if not arg_idxs_rev:
+            span = spans[i]
+            if span.argc == 0:
                 continue
 
-            arg_idxs = list(reversed(arg_idxs_rev))
-
             if len(positions) == 1 and positions[0] == -1:
-                target_positions = list(range(1, len(arg_idxs) + 1))
+                target_positions: Sequence[int] = range(1, span.argc + 1)
             else:
-                target_positions = list(positions)
+                target_positions = positions
 
             for pos in target_positions:
-                if pos <= 0 or pos > len(arg_idxs):
+                target_j = span.arg(pos)
+                if target_j is None:
                     continue
-                target_j = arg_idxs[pos - 1]
                 pin = insns[target_j]
-                if pin.name != "PUSHI" or len(pin.operand_bytes) != 4:
+                if pin.name != "PUSHI" or len(pin.values) != 1:
                     continue
-                off = _u32_le(pin.operand_bytes)
+                off = pin.values[0]
                 it = str1_index.resolve(off)
                 if not it:
                     print(
@@ -491,33 +652,31 @@ def apply_string_mappings(
     return used_str1, used_str2
 
 
-def decode_asb_to_txt(input_file: Union[str, Path], output_file: Union[str, Path]) -> None:
+@dataclass
+class DecodedAsb:
+    entries: List[AsbEntry]
+    insns: List[VmInsn]
+    str1_index: CStringIndex
+    str2_index: CStringIndex
+    used_str1: Set[int]
+    used_str2: Set[int]
+
+
+def decode_asb(file_bytes: Buffer) -> DecodedAsb:
     opcode_table = _OPCODE_TABLE
     str_cfg = load_str_config_from_embedded_json()
 
-    file_bytes = Path(input_file).read_bytes()
     header = parse_asb_header(file_bytes)
 
     entries = parse_entry_table(header, file_bytes)
-    code = _slice_region(file_bytes, header.code_off, header.code_size)
+    code_start, code_end = _region_bounds(len(file_bytes), header.code_off, header.code_size)
     str1 = _slice_region(file_bytes, header.str1_off, header.str1_size)
     str2 = _slice_region(file_bytes, header.str2_off, header.str2_size)
 
     str1_index = CStringIndex(str1)
     str2_index = CStringIndex(str2)
 
-    output_lines: List[str] = []
-
-    output_lines.append("[VARIABLE]")
-    for e in entries:
-        safe_name = escape_text_for_line(e.name)
-        output_lines.append(
-            f"{safe_name},{fmt_u32(e.unk04)},{e.locals_count},{e.param_count},{fmt_u32(e.flag0c)},{fmt_u32(e.unk10)}"
-        )
-
-    output_lines.append("")
-    output_lines.append("[CODE]")
-    insns = parse_code(code, opcode_table)
+    insns = parse_code(file_bytes, opcode_table, start=code_start, end=code_end)
     used_str1, used_str2 = apply_string_mappings(
         insns,
         str1_index=str1_index,
@@ -525,34 +684,73 @@ def decode_asb_to_txt(input_file: Union[str, Path], output_file: Union[str, Path
         entry_name_offs=[e.name_off for e in entries],
         str_cfg=str_cfg,
     )
-    for insn in insns:
-        if insn.text_only:
-            output_lines.append(insn.operands[0] if insn.operands else "")
-            continue
-        if not insn.name:
-            continue
-        if insn.operands:
-            output_lines.append(f"{insn.name} {', '.join(insn.operands)}")
-        else:
-            output_lines.append(insn.name)
+    return DecodedAsb(
+        entries=entries,
+        insns=insns,
+        str1_index=str1_index,
+        str2_index=str2_index,
+        used_str1=used_str1,
+        used_str2=used_str2,
+    )
+
+
+def _entry_line(e: AsbEntry) -> str:
+    safe_name = escape_text_for_line(e.name)
+    return f"{safe_name},{fmt_u32(e.unk04)},{e.locals_count},{e.param_count},{fmt_u32(e.flag0c)},{fmt_u32(e.unk10)}"
 
-    remaining_1 = [it for it in str1_index.items if it.start not in used_str1]
-    if remaining_1:
-        output_lines.append("")
-        output_lines.append("[STRINGS_1]")
-        for it in remaining_1:
-            safe = escape_text_for_line(it.text)
-            output_lines.append(f"{fmt_u32(it.start)}: {safe}")
 
-    remaining_2 = [it for it in str2_index.items if it.start not in used_str2]
-    if remaining_2:
-        output_lines.append("")
-        output_lines.append("[STRINGS_2]")
-        for it in remaining_2:
+def insn_line(insn: VmInsn) -> Optional[str]:
+    # [CODE] 中的一行；被字符串替换掉的指令（name 为空且非 text_only）不输出
+    if insn.text_only:
+        return insn.operands[0] if insn.operands else ""
+    if not insn.name:
+        return None
+    if insn.operands:
+        return f"{insn.name} {', '.join(insn.operands)}"
+    return insn.name
+
+
+def iter_txt_lines(dec: DecodedAsb) -> Iterator[str]:
+    yield "[VARIABLE]"
+    for e in dec.entries:
+        yield _entry_line(e)
+
+    yield ""
+    yield "[CODE]"
+    for insn in dec.insns:
+        line = insn_line(insn)
+        if line is not None:
+            yield line
+
+    for title, index, used in (("[STRINGS_1]", dec.str1_index, dec.used_str1), ("[STRINGS_2]", dec.str2_index, dec.used_str2)):
+        remaining = [it for it in index.items if it.start not in used]
+        if not remaining:
+            continue
+        yield ""
+        yield title
+        for it in remaining:
             safe = escape_text_for_line(it.text)
-            output_lines.append(f"{fmt_u32(it.start)}: {safe}")
+            yield f"{fmt_u32(it.start)}: {safe}"
+
 
-    Path(output_file).write_text("\n".join(output_lines), encoding="utf-8", errors="ignore")
+def _write_lines(f: TextIO, lines: Iterable[str]) -> None:
+    # 与 "\n".join(lines) 等价（末尾不追加换行），但不在内存里拼出整个文本
+    sep = ""
+    for line in lines:
+        f.write(sep)
+        f.write(line)
+        sep = "\n"
+
+
+def decode_asb_bytes(data: Buffer) -> str:
+    # 内存版：与 decode_asb_to_txt 写出的内容相同（换行统一为 \n）
+    return "\n".join(iter_txt_lines(decode_asb(data)))
+
+
+def decode_asb_to_txt(input_file: Union[str, Path], output_file: Union[str, Path]) -> None:
+    dec = decode_asb(Path(input_file).read_bytes())
+    with open(output_file, "w", encoding="utf-8", errors="ignore", buffering=1 << 16) as f:
+        _write_lines(f, iter_txt_lines(dec))
 
 
 @dataclass(frozen=True)
@@ -577,7 +775,8 @@ class CodeLineString:
     text: str
 
 
-CodeLine = Union[CodeLineInsn, CodeLineString]
+# VmInsn 只出现在 encode_decoded_asb 里：规范的十六进制指令直接按原始数值打包
+CodeLine = Union[CodeLineInsn, CodeLineString, VmInsn]
 
 def _pack_u32(n: int) -> bytes:
     return int(n & 0xFFFFFFFF).to_bytes(4, "little", signed=False)
@@ -591,12 +790,6 @@ def _looks_like_hex_token(s: str) -> bool:
     return bool(_HEX_TOKEN_RE.match(s.strip()))
 
 
-def _split_operands(s: str) -> List[str]:
-    if not s.strip():
-        return []
-    return [p.strip() for p in s.split(",") if p.strip()]
-
-
 def _parse_txt_sections(text: str) -> Dict[str, List[str]]:
     sec: Optional[str] = None
     out: Dict[str, List[str]] = {}
@@ -646,86 +839,213 @@ def _unescape_operand_token(token: str) -> str:
     return unescape_text_from_line(token)
 
 
+@dataclass(frozen=True)
+class OperandRule:
+    # 文本行里一条指令的操作数校验规则：kinds 每个字符对应一个位置，
+    # "h" 必须是十六进制，"s" 十六进制或任意非空文本（JMPG/CALLG 的脚本名/函数名）。
+    # 多出来的操作数不检查；exact 要求个数正好是 len(kinds)；variadic 表示 BTBL：至少一个且全部是十六进制
+    kinds: str
+    exact: bool = False
+    variadic: bool = False
+
+
+def compile_operand_rules(opcode_table: Sequence[OpcodeDef]) -> Dict[str, Optional[OperandRule]]:
+    # None 表示这个长度无法从文本还原，整行按字符串处理
+    by_len: Dict[int, OperandRule] = {
+        0: OperandRule("", exact=True),
+        1: OperandRule("h"),
+        4: OperandRule("h"),
+        5: OperandRule("hh"),
+        8: OperandRule("hh"),
+        9: OperandRule("hhh"),
+    }
+    named: Dict[str, OperandRule] = {
+        "JMPG": OperandRule("ss"),
+        "CALLG": OperandRule("ssh"),
+    }
+    rules: Dict[str, Optional[OperandRule]] = {}
+    for op in opcode_table:
+        if op.total_size == -1:
+            rules[op.name] = OperandRule("h", variadic=True)
+            continue
+        operand_len = max(op.total_size - 1, 0)
+        rule = by_len.get(operand_len)
+        if rule is not None and op.name in named and operand_len in (8, 9):
+            rule = named[op.name]
+        rules[op.name] = rule
+    return rules
+
+
+_OPERAND_RULES = compile_operand_rules(_OPCODE_TABLE)
+_HEX_MATCH = _HEX_TOKEN_RE.match
+
+
+def _operands_ok(rule: Optional[OperandRule], operands: Sequence[str]) -> bool:
+    if rule is None:
+        return False
+    kinds = rule.kinds
+    n = len(operands)
+    if rule.variadic:
+        return n > 0 and all(_HEX_MATCH(x.strip()) for x in operands)
+    if n < len(kinds) or (rule.exact and n != len(kinds)):
+        return False
+    for kind, x in zip(kinds, operands):
+        # "s" 位置只要求非空；十六进制必然非空，所以不用再匹配
+        if kind == "s":
+            if not x:
+                return False
+        elif not _HEX_MATCH(x.strip()):
+            return False
+    return True
+
+
+# asb.py d 输出的规范写法：NAME 或 NAME XX, XXXXXXXX, ...（大写十六进制、", " 分隔）。
+# 整行一次匹配就能拿到名字和全部操作数，而且全是十六进制，只需要按个数校验
+_CANON_INSN_RE = re.compile(r"([A-Z]+)(?: ([0-9A-F]+(?:, [0-9A-F]+)*))?")
+
+
+def _count_range(rule: OperandRule) -> Tuple[int, int]:
+    # 操作数已知全是十六进制时，规则只剩个数限制 lo <= n <= hi
+    if rule.variadic:
+        return 1, sys.maxsize
+    k = len(rule.kinds)
+    return k, (k if rule.exact else sys.maxsize)
+
+
+_COUNT_RANGES = {name: _count_range(rule) for name, rule in _OPERAND_RULES.items() if rule is not None}
+
+
 def _parse_code_lines(lines: Sequence[str], opcode_table: Sequence[OpcodeDef], opcode_index_by_name: Dict[str, int]) -> List[CodeLine]:
     out: List[CodeLine] = []
-    opcode_names = set(opcode_index_by_name.keys())
+    if opcode_table is _OPCODE_TABLE and opcode_index_by_name.keys() == _OPERAND_RULES.keys():
+        # 默认表的规则在导入时就建好了，逐行调用（encode_decoded_asb）时不必每次重建
+        rules, count_ranges = _OPERAND_RULES, _COUNT_RANGES
+    else:
+        rules = compile_operand_rules(opcode_table)
+        rules = {name: rules[name] for name in opcode_index_by_name}
+        count_ranges = {name: _count_range(rule) for name, rule in rules.items() if rule is not None}
+    canon = _CANON_INSN_RE.fullmatch
+    append = out.append
     for raw in lines:
         line = raw.rstrip()
         if not line:
             continue
-        name = line.split(None, 1)[0].strip()
-        if name in opcode_names:
-            rest = line[len(name) :].strip()
-            operands = [_unescape_operand_token(x) for x in _split_operands(rest)]
-            op_def = opcode_table[opcode_index_by_name[name]]
-
-            if op_def.total_size == -1:
-                if not operands or not _looks_like_hex_token(operands[0]) or any(not _looks_like_hex_token(x) for x in operands[1:]):
-                    out.append(CodeLineString(text=unescape_text_from_line(line)))
-                    continue
-                out.append(CodeLineInsn(name=name, operands=operands, raw_line=line))
-                continue
-
-            operand_len = max(op_def.total_size - 1, 0)
-            ok = True
-            if operand_len == 0:
-                ok = len(operands) == 0
-            elif operand_len == 1:
-                ok = len(operands) >= 1 and _looks_like_hex_token(operands[0])
-            elif operand_len == 4:
-                ok = len(operands) >= 1 and _looks_like_hex_token(operands[0])
-            elif operand_len == 5:
-                ok = len(operands) >= 2 and _looks_like_hex_token(operands[0]) and _looks_like_hex_token(operands[1])
-            elif operand_len == 8:
-                if name == "JMPG":
-                    ok = len(operands) >= 2 and (_looks_like_hex_token(operands[0]) or operands[0]) and (
-                        _looks_like_hex_token(operands[1]) or operands[1]
-                    )
-                else:
-                    ok = len(operands) >= 2 and _looks_like_hex_token(operands[0]) and _looks_like_hex_token(operands[1])
-            elif operand_len == 9:
-                if name == "CALLG":
-                    ok = len(operands) >= 3 and (_looks_like_hex_token(operands[0]) or operands[0]) and (
-                        _looks_like_hex_token(operands[1]) or operands[1]
-                    ) and _looks_like_hex_token(operands[2])
+        m = canon(line)
+        if m is not None:
+            name, ops = m.groups()
+            if name in rules:
+                operands = ops.split(", ") if ops else []
+                lo, hi = count_ranges.get(name, (1, 0))
+                if lo <= len(operands) <= hi:
+                    append(CodeLineInsn(name=name, operands=operands, raw_line=line))
                 else:
-                    ok = (
-                        len(operands) >= 3
-                        and _looks_like_hex_token(operands[0])
-                        and _looks_like_hex_token(operands[1])
-                        and _looks_like_hex_token(operands[2])
-                    )
-            else:
-                ok = False
-
-            if not ok:
-                out.append(CodeLineString(text=unescape_text_from_line(line)))
+                    append(CodeLineString(text=unescape_text_from_line(line)))
                 continue
-
-            out.append(CodeLineInsn(name=name, operands=operands, raw_line=line))
+        name = line.split(None, 1)[0]
+        if name not in rules:
+            append(CodeLineString(text=unescape_text_from_line(line)))
+            continue
+        # 非规范写法（手改的文本、0x 前缀、脚本名操作数等）：逗号拆开，去空白、去空项、反转义后逐个校验
+        rest = line[len(name) :]
+        operands = [unescape_text_from_line(t) for t in map(str.strip, rest.split(",")) if t]
+        if _operands_ok(rules[name], operands):
+            append(CodeLineInsn(name=name, operands=operands, raw_line=line))
         else:
-            out.append(CodeLineString(text=unescape_text_from_line(line)))
+            append(CodeLineString(text=unescape_text_from_line(line)))
     return out
 
 
+def pack_cstrings(
+    texts: Iterable[str],
+    base: bytes = b"",
+    base_offs: Optional[Dict[str, int]] = None,
+) -> Tuple[bytes, Dict[str, int], int]:
+    # 尾部共享打包：若一个字符串（按 cp932 字节）是另一个的后缀，就直接指向长串的尾部。
+    # 按反转后的字节排序，后缀关系在排序结果里一定相邻，整体 O(n log n)。
+    # base/base_offs 是已经放好的前缀区域（例如变量名），位置保持不变，但可以被新字符串共享。
+    # 返回 (区域字节, text -> offset, 相比逐条追加节省的字节数)
+    offs: Dict[str, int] = dict(base_offs or {})
+    buf = bytearray(base)
+
+    new: List[str] = []
+    seen: Set[str] = set(offs)
+    for t in texts:
+        if t not in seen:
+            seen.add(t)
+            new.append(t)
+    enc: Dict[str, bytes] = {t: encode_text(t) for t in list(offs) + new}
+    plain_size = len(base) + sum(len(enc[t]) + 1 for t in new)
+
+    fixed: Dict[bytes, int] = {}
+    for t, off in offs.items():
+        fixed.setdefault(enc[t], off)
+
+    keys = sorted({b for b in enc.values() if b}, key=lambda b: b[::-1])
+    host: Dict[bytes, bytes] = {}
+    for i in range(len(keys) - 1, -1, -1):
+        k = keys[i]
+        nxt = keys[i + 1] if i + 1 < len(keys) else None
+        host[k] = host[nxt] if nxt is not None and nxt[::-1].startswith(k[::-1]) else k
+
+    placed: Dict[bytes, int] = dict(fixed)
+    for t in new:
+        b = enc[t]
+        if not b:
+            # 空串单独占一个 \0，不挂到别的字符串结尾
+            offs[t] = len(buf)
+            buf.append(0)
+            continue
+        if b in fixed:
+            offs[t] = fixed[b]
+            continue
+        h = host[b]
+        if h not in placed:
+            placed[h] = len(buf)
+            buf.extend(h)
+            buf.append(0)
+        offs[t] = placed[h] + len(h) - len(b)
+
+    for t in new:
+        if _read_cstring(buf, offs[t]) != enc[t]:
+            raise ValueError(f"字符串池打包校验失败: {t!r} @ {fmt_u32(offs[t])}")
+
+    return bytes(buf), offs, plain_size - len(buf)
+
+
 def _build_str2_pool(code_lines: Sequence[CodeLine]) -> Dict[str, int]:
     pool: Dict[str, int] = {}
     off = 0
-    for it in code_lines:
-        if not isinstance(it, CodeLineInsn):
+    for s2 in _iter_str2_texts(code_lines):
+        if s2 in pool:
             continue
-        if it.name in {"JMPG", "CALLG"} and it.operands:
-            s2 = it.operands[0]
-            if _looks_like_hex_token(s2):
-                continue
-            if s2 in pool:
-                continue
-            pool[s2] = off
-            off += len(encode_text(s2)) + 1
+        pool[s2] = off
+        off += len(encode_text(s2)) + 1
     return pool
 
 
-def _build_str1_region(variable_rows: Sequence[VariableRow], code_lines: Sequence[CodeLine]) -> Tuple[bytes, List[int], Dict[str, int]]:
+def _iter_str2_texts(code_lines: Sequence[CodeLine]) -> Iterator[str]:
+    for it in code_lines:
+        if isinstance(it, CodeLineInsn) and it.name in {"JMPG", "CALLG"} and it.operands:
+            if not _looks_like_hex_token(it.operands[0]):
+                yield it.operands[0]
+
+
+def _iter_str1_extra_texts(code_lines: Sequence[CodeLine]) -> Iterator[str]:
+    for it in code_lines:
+        if isinstance(it, CodeLineString):
+            yield it.text
+            continue
+        if it.name in {"JMPG", "CALLG"} and len(it.operands) >= 2:
+            if not _looks_like_hex_token(it.operands[1]):
+                yield it.operands[1]
+
+
+def _build_str1_region(
+    variable_rows: Sequence[VariableRow],
+    code_lines: Sequence[CodeLine],
+    *,
+    pack: bool = False,
+) -> Tuple[bytes, List[int], Dict[str, int], int]:
     buf = bytearray()
     entry_name_offs: List[int] = [0] * len(variable_rows)
 
@@ -739,6 +1059,10 @@ def _build_str1_region(variable_rows: Sequence[VariableRow], code_lines: Sequenc
         buf.extend(encode_text(name))
         buf.append(0)
 
+    if pack:
+        region, text_to_off, saved = pack_cstrings(_iter_str1_extra_texts(code_lines), bytes(buf), text_to_off)
+        return region, entry_name_offs, text_to_off, saved
+
     def ensure_extra(s: str) -> int:
         # 代码区域引用的 STRINGS_1：如果文本已存在则复用 offset，避免重复占用空间
         if s in text_to_off:
@@ -749,16 +1073,10 @@ def _build_str1_region(variable_rows: Sequence[VariableRow], code_lines: Sequenc
         text_to_off[s] = off
         return off
 
-    for it in code_lines:
-        if isinstance(it, CodeLineString):
-            ensure_extra(it.text)
-            continue
-        if it.name in {"JMPG", "CALLG"} and len(it.operands) >= 2:
-            s1 = it.operands[1]
-            if not _looks_like_hex_token(s1):
-                ensure_extra(s1)
+    for s1 in _iter_str1_extra_texts(code_lines):
+        ensure_extra(s1)
 
-    return bytes(buf), entry_name_offs, text_to_off
+    return bytes(buf), entry_name_offs, text_to_off, 0
 
 
 def _build_str2_region(str2_pool: Dict[str, int]) -> bytes:
@@ -831,19 +1149,39 @@ def _encode_operand_bytes(
     raise ValueError(f"unsupported operand_len={operand_len} for {opcode.name}")
 
 
-def encode_txt_to_asb(input_file: Union[str, Path], output_file: Union[str, Path]) -> None:
+def encode_asb_text(txt: str, filename: str, *, pack_strings: bool = False) -> bytes:
+    # 内存版：filename 写进文件头（通常就是输出的 xxx.asb 文件名）
+    return _encode_asb(txt, filename, pack_strings)[0]
+
+
+def _encode_asb(txt: str, filename: str, pack_strings: bool) -> Tuple[bytes, int]:
+    # 返回 (ASB 字节, 字符串池尾部共享节省的字节数)
     opcode_table = _OPCODE_TABLE
     opcode_index_by_name = {op.name: i for i, op in enumerate(opcode_table)}
 
-    txt = Path(input_file).read_text(encoding="utf-8", errors="ignore")
     sections = _parse_txt_sections(txt)
 
     variable_rows = _parse_variable_rows(sections.get("VARIABLE", []))
     code_lines = _parse_code_lines(sections.get("CODE", []), opcode_table, opcode_index_by_name)
+    return _build_asb(variable_rows, code_lines, filename, pack_strings)
+
+
+def _build_asb(
+    variable_rows: Sequence[VariableRow],
+    code_lines: Sequence[CodeLine],
+    filename: str,
+    pack_strings: bool,
+) -> Tuple[bytes, int]:
+    opcode_table = _OPCODE_TABLE
+    opcode_index_by_name = {op.name: i for i, op in enumerate(opcode_table)}
 
-    str2_pool = _build_str2_pool(code_lines)
-    str1_region, entry_name_offs, str1_text_to_off = _build_str1_region(variable_rows, code_lines)
-    str2_region = _build_str2_region(str2_pool)
+    str1_region, entry_name_offs, str1_text_to_off, saved1 = _build_str1_region(variable_rows, code_lines, pack=pack_strings)
+    if pack_strings:
+        str2_region, str2_pool, saved2 = pack_cstrings(_iter_str2_texts(code_lines))
+    else:
+        str2_pool = _build_str2_pool(code_lines)
+        str2_region = _build_str2_region(str2_pool)
+        saved2 = 0
 
     entry_table = bytearray()
     for i, row in enumerate(variable_rows):
@@ -857,6 +1195,10 @@ def encode_txt_to_asb(input_file: Union[str, Path], output_file: Union[str, Path
 
     code_bytes = bytearray()
     for it in code_lines:
+        if isinstance(it, VmInsn):
+            code_bytes.append(it.opcode)
+            code_bytes.extend(it.operand_bytes)
+            continue
         if isinstance(it, CodeLineString):
             # 无法解析成命令 -> 当成字符串，编码成 PUSHI <STRINGS_1 offset>
             off = str1_text_to_off[it.text]
@@ -876,7 +1218,6 @@ def encode_txt_to_asb(input_file: Union[str, Path], output_file: Union[str, Path
         code_bytes.append(opcode_idx)
         code_bytes.extend(operand_bytes)
 
-    filename = Path(output_file).name
     out_bytes = build_asb_bytes(
         filename=filename,
         entry_table_bytes=bytes(entry_table),
@@ -885,7 +1226,50 @@ def encode_txt_to_asb(input_file: Union[str, Path], output_file: Union[str, Path
         str1_bytes=str1_region,
         str2_bytes=str2_region,
     )
+    return out_bytes, saved1 + saved2
+
+
+def txt_line_roundtrips(line: str) -> bool:
+    # 这一行写进 TXT 再按 splitlines()/段落规则读回来，是否还是同一行（不会被拆开、也不会被当成 [段落]）
+    if line.startswith("\ufeff") or (line.startswith("[") and line.endswith("]")):
+        return False
+    pieces = (line + "\n").splitlines()
+    return len(pieces) == 1 and pieces[0] == line
+
+
+def encode_decoded_asb(dec: DecodedAsb, filename: str, *, pack_strings: bool = False) -> Optional[bytes]:
+    # 不经过 TXT，直接从（可能改过文本行的）指令列表重建 ASB；结果与 "\n".join(iter_txt_lines(dec)) 再 encode_asb_text 相同。
+    # 规范的十六进制指令直接按原始数值打包；文本行、JMPG/CALLG 的名字行仍按单行走 _parse_code_lines，
+    # 保证空行丢弃、像指令的文本等分类规则一致。某一行写成 TXT 后无法逐行还原时返回 None，由调用方改走文本路径
+    opcode_table = _OPCODE_TABLE
+    opcode_index_by_name = {op.name: i for i, op in enumerate(opcode_table)}
+
+    entry_lines = [_entry_line(e) for e in dec.entries]
+    if not all(txt_line_roundtrips(x) for x in entry_lines):
+        return None
+    variable_rows = _parse_variable_rows(entry_lines)
+
+    code_lines: List[CodeLine] = []
+    append = code_lines.append
+    for insn in dec.insns:
+        if not insn.text_only and insn.name not in {"JMPG", "CALLG"}:
+            if insn.name:
+                append(insn)
+            continue
+        line = insn_line(insn) or ""
+        if not txt_line_roundtrips(line):
+            return None
+        code_lines.extend(_parse_code_lines([line], opcode_table, opcode_index_by_name))
+
+    return _build_asb(variable_rows, code_lines, filename, pack_strings)[0]
+
+
+def encode_txt_to_asb(input_file: Union[str, Path], output_file: Union[str, Path], *, pack_strings: bool = False) -> int:
+    # pack_strings 产物里指向字符串中间的指针，asb.py d 解析为从该处开始的后缀，可以照常解码、修改、再编码
+    txt = Path(input_file).read_text(encoding="utf-8", errors="ignore")
+    out_bytes, saved = _encode_asb(txt, Path(output_file).name, pack_strings)
     Path(output_file).write_bytes(out_bytes)
+    return saved
 
 
 def build_asb_bytes(
@@ -927,25 +1311,389 @@ def build_asb_bytes(
     return bytes(out)
 
 
-def _decode_dir(input_dir: Path, output_dir: Path) -> None:
-    for p in input_dir.rglob("*.asb"):
-        rel = p.relative_to(input_dir)
-        out_path = output_dir / rel.with_suffix(".txt")
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        decode_asb_to_txt(p, out_path)
+def _convert_one(task: Tuple[str, Path, Path, bool]) -> Tuple[Path, int, Optional[str], int]:
+    # 进程池 worker：单个文件出错只记录，不中断整批
+    mode, src, dst, pack_strings = task
+    try:
+        size = src.stat().st_size
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        saved = 0
+        if mode == "d":
+            decode_asb_to_txt(src, dst)
+        else:
+            saved = encode_txt_to_asb(src, dst, pack_strings=pack_strings)
+        return src, size, None, saved
+    except Exception as e:
+        # 上次成功生成的产物（或写了一半的文件）不能留着：否则后续打包会把旧内容当成这次的结果
+        try:
+            dst.unlink(missing_ok=True)
+        except OSError:
+            pass
+        return src, 0, f"{type(e).__name__}: {e}", 0
+
+
+def _run_batch(mode: str, tasks: Sequence[Tuple[Path, Path]], jobs: int, pack_strings: bool = False) -> Set[Path]:
+    items = [(mode, src, dst, pack_strings) for src, dst in tasks]
+    t0 = time.perf_counter()
+    if jobs <= 1 or len(items) <= 1:
+        results = [_convert_one(it) for it in items]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            # map 按提交顺序返回，汇总输出与单进程一致
+            results = list(ex.map(_convert_one, items, chunksize=max(1, len(items) // (jobs * 8))))
+    elapsed = time.perf_counter() - t0
+
+    failed = [(src, err) for src, _, err, _ in results if err is not None]
+    done = len(results) - len(failed)
+    total_bytes = sum(size for _, size, _, _ in results)
+    rate = done / elapsed if elapsed > 0 else 0.0
+    mbps = total_bytes / (1024 * 1024) / elapsed if elapsed > 0 else 0.0
+
+    for src, err in failed:
+        print(f"[ERROR] {src}: {err}", file=sys.stderr)
+    if pack_strings:
+        for src, _, err, saved in results:
+            if err is None:
+                print(f"[PACK] {src}: 字符串池节省 {saved} 字节", file=sys.stderr)
+        print(f"[PACK] 合计节省 {sum(r[3] for r in results)} 字节", file=sys.stderr)
+    action = "解码" if mode == "d" else "编码"
+    tag = "[WARN]" if failed else "[OK]"
+    print(
+        f"{tag} {action} {done}/{len(results)} 个文件，{total_bytes / (1024 * 1024):.2f} MB，"
+        f"{elapsed:.2f} s（{rate:.1f} 文件/s，{mbps:.2f} MB/s，jobs={jobs}），失败 {len(failed)}",
+        file=sys.stderr,
+    )
+    return {src for src, _ in failed}
+
+
+def _decode_dir(input_dir: Path, output_dir: Path, jobs: int = 1) -> int:
+    tasks = [(p, output_dir / p.relative_to(input_dir).with_suffix(".txt")) for p in sorted(input_dir.rglob("*.asb"))]
+    return 1 if _run_batch("d", tasks, jobs) else 0
+
+
+_MANIFEST_NAME = ".asb_manifest.json"
+
+
+def _tool_version() -> str:
+    # 编码器本身改动后旧产物全部失效：直接用本文件内容的哈希作版本号
+    return hashlib.sha1(Path(__file__).read_bytes()).hexdigest()
+
+
+def _file_sha1(p: Path) -> str:
+    return hashlib.sha1(p.read_bytes()).hexdigest()
+
 
+def _load_manifest(p: Path) -> Dict[str, Any]:
+    try:
+        data = json.loads(p.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
 
-def _encode_dir(input_dir: Path, output_dir: Path) -> None:
-    for p in input_dir.rglob("*.txt"):
+
+def _encode_dir(input_dir: Path, output_dir: Path, jobs: int = 1, force: bool = False, pack_strings: bool = False) -> int:
+    manifest_path = output_dir / _MANIFEST_NAME
+    version = _tool_version() + ("+pack" if pack_strings else "")
+    old = _load_manifest(manifest_path)
+    old_files: Dict[str, Dict[str, str]] = old.get("files", {}) if isinstance(old.get("files"), dict) else {}
+    reusable = not force and old.get("version") == version
+
+    tasks: List[Tuple[Path, Path]] = []
+    new_files: Dict[str, Dict[str, str]] = {}
+    src_by_rel: Dict[str, Path] = {}
+    skipped = 0
+    for p in sorted(input_dir.rglob("*.txt")):
         rel = p.relative_to(input_dir)
-        out_path = output_dir / rel.with_suffix(".asb")
+        rel_key = rel.as_posix()
+        out_rel = rel.with_suffix(".asb").as_posix()
+        out_path = output_dir / out_rel
+        digest = _file_sha1(p)
+        new_files[rel_key] = {"sha1": digest, "out": out_rel}
+        src_by_rel[rel_key] = p
+        prev = old_files.get(rel_key)
+        if reusable and isinstance(prev, dict) and prev.get("sha1") == digest and out_path.exists():
+            skipped += 1
+            continue
+        tasks.append((p, out_path))
+
+    # 源 txt 已删除的脚本：清掉上次由它生成的 asb
+    removed = 0
+    for rel_key, prev in old_files.items():
+        if rel_key in new_files or not isinstance(prev, dict) or not prev.get("out"):
+            continue
+        stale = output_dir / prev["out"]
+        if stale.is_file():
+            stale.unlink()
+            removed += 1
+
+    failed = _run_batch("e", tasks, jobs, pack_strings) if tasks else set()
+    # 失败的文件不写入清单，下次运行会重新编码
+    for rel_key, p in src_by_rel.items():
+        if p in failed:
+            del new_files[rel_key]
+
+    manifest = {"version": version, "files": new_files}
+    manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"[OK] 增量编码：跳过未变化 {skipped} 个，重新编码 {len(tasks)} 个，删除过期输出 {removed} 个", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _asb_region_at(header: AsbHeader, off: int) -> str:
+    if off < 0x44:
+        return "header"
+    for name, start, size in (
+        ("entry_table", header.entry_table_off, header.entry_count * 20),
+        ("code", header.code_off, header.code_size),
+        ("strings_1", header.str1_off, header.str1_size),
+        ("strings_2", header.str2_off, header.str2_size),
+    ):
+        if start <= off < start + size:
+            return name
+    return "padding"
+
+
+def _first_struct_diff(orig: DecodedAsb, rebuilt: DecodedAsb) -> Optional[Dict[str, Any]]:
+    # 结构比较：入口表按字段、代码按解码后的行（字符串指针已替换成文本），不看字符串区的排布
+    for i in range(max(len(orig.entries), len(rebuilt.entries))):
+        a = _entry_line(orig.entries[i]) if i < len(orig.entries) else None
+        b = _entry_line(rebuilt.entries[i]) if i < len(rebuilt.entries) else None
+        if a != b:
+            return {"section": "VARIABLE", "index": i, "expected": a, "actual": b}
+
+    for i in range(max(len(orig.insns), len(rebuilt.insns))):
+        x = orig.insns[i] if i < len(orig.insns) else None
+        y = rebuilt.insns[i] if i < len(rebuilt.insns) else None
+        a = insn_line(x) if x is not None else None
+        b = insn_line(y) if y is not None else None
+        if a != b:
+            pc = x.pc if x is not None else (y.pc if y is not None else None)
+            return {"section": "CODE", "index": i, "pc": pc, "expected": a, "actual": b}
+    return None
+
+
+def _verify_one(task: Tuple[Path, Path, bool]) -> Dict[str, Any]:
+    root, p, pack_strings = task
+    report: Dict[str, Any] = {"file": p.relative_to(root).as_posix()}
+    try:
+        data = p.read_bytes()
+        orig = decode_asb(data)
+        txt = "\n".join(iter_txt_lines(orig))
+        if pack_strings:
+            # 尾部共享打包后再解码，[VARIABLE]/[CODE] 必须与原文件逐行相同
+            packed_bytes = encode_asb_text(txt, p.name, pack_strings=True)
+            with contextlib.redirect_stderr(io.StringIO()):
+                packed = decode_asb(packed_bytes)
+            diff = _first_struct_diff(orig, packed)
+            if diff is not None:
+                report["status"] = "pack_mismatch"
+                report["first_diff"] = diff
+                return report
+
+        rebuilt_bytes = encode_asb_text(txt, p.name)
+        if rebuilt_bytes == data:
+            report["status"] = "identical"
+            return report
+
+        n = min(len(data), len(rebuilt_bytes))
+        diff_off = next((i for i in range(n) if data[i] != rebuilt_bytes[i]), n)
+        report["byte_diff_offset"] = diff_off
+        report["byte_diff_region"] = _asb_region_at(parse_asb_header(data), diff_off)
+        report["size"] = [len(data), len(rebuilt_bytes)]
+
+        # 重编码后的文件再解一次只用于比较，警告已在第一次解码时输出过
+        with contextlib.redirect_stderr(io.StringIO()):
+            rebuilt = decode_asb(rebuilt_bytes)
+        diff = _first_struct_diff(orig, rebuilt)
+        if diff is None:
+            report["status"] = "equivalent"
+        else:
+            report["status"] = "mismatch"
+            report["first_diff"] = diff
+    except Exception as e:
+        report["status"] = "error"
+        report["error"] = f"{type(e).__name__}: {e}"
+    return report
+
+
+def _verify_dir(root: Path, report_path: Optional[Path], jobs: int, strict: bool, pack_strings: bool = False) -> int:
+    tasks = [(root, p, pack_strings) for p in sorted(root.rglob("*.asb"))]
+    t0 = time.perf_counter()
+    if jobs <= 1 or len(tasks) <= 1:
+        reports = [_verify_one(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            reports = list(ex.map(_verify_one, tasks, chunksize=max(1, len(tasks) // (jobs * 8))))
+    elapsed = time.perf_counter() - t0
+
+    counts: Dict[str, int] = {}
+    for r in reports:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    bad_status = {"mismatch", "pack_mismatch", "error"} | ({"equivalent"} if strict else set())
+    bad = [r for r in reports if r["status"] in bad_status]
+
+    text = json.dumps({"summary": counts, "files": reports}, ensure_ascii=False, indent=2)
+    if report_path is None:
+        print(text)
+    else:
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report_path.write_text(text, encoding="utf-8")
+
+    for r in bad:
+        where = r.get("first_diff") or {"byte_diff_offset": r.get("byte_diff_offset"), "error": r.get("error")}
+        print(f"[ERROR] {r['file']}: {r['status']} {where}", file=sys.stderr)
+    summary = "，".join(f"{k} {v}" for k, v in sorted(counts.items()))
+    tag = "[WARN]" if bad else "[OK]"
+    print(f"{tag} 校验 {len(reports)} 个文件，{elapsed:.2f} s（jobs={jobs}）：{summary}", file=sys.stderr)
+    return 1 if bad else 0
+
+
+# -------- info：只读文件头和入口表 --------
+
+_INFO_FIELDS = ["file", "size", "filename", "entry_count", "code_size", "str1_size", "str2_size", "entries", "error"]
+
+
+def read_asb_head(path: Path) -> Tuple[AsbHeader, List[AsbEntry]]:
+    # 只读 0x44 字节头、入口表，以及 STRINGS_1 开头到最后一个入口名结束的那一段；代码区完全不读
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        header = parse_asb_header(f.read(0x44))
+
+        t_lo, t_hi = _region_bounds(size, header.entry_table_off, header.entry_count * 20)
+        f.seek(t_lo)
+        table = f.read(t_hi - t_lo)
+
+        s_lo, s_hi = _region_bounds(size, header.str1_off, header.str1_size)
+        s_len = s_hi - s_lo
+        name_offs = [_read_u32_at(table, i * 20) for i in range(len(table) // 20)]
+        last = max((o for o in name_offs if o < s_len), default=-1)
+        f.seek(s_lo)
+        str1 = bytearray(f.read(last + 1))
+        # 入口名一般就在 STRINGS_1 开头；读到最后一个名字的 \0 为止
+        while last >= 0 and 0 not in str1[last:] and len(str1) < s_len:
+            chunk = f.read(min(256, s_len - len(str1)))
+            if not chunk:
+                break
+            str1 += chunk
+
+    # 把读到的两段拼成一个小 buffer，offset 换成相对它的，再交给 parse_entry_table
+    local = replace(header, entry_table_off=0, str1_off=len(table), str1_size=len(str1))
+    return header, parse_entry_table(local, table + bytes(str1))
+
+
+def _info_one(task: Tuple[Path, Path]) -> Dict[str, Any]:
+    root, p = task
+    row: Dict[str, Any] = {"file": p.relative_to(root).as_posix(), "size": p.stat().st_size}
+    try:
+        header, entries = read_asb_head(p)
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+        return row
+    row.update(
+        filename=header.filename,
+        entry_count=header.entry_count,
+        code_size=header.code_size,
+        str1_size=header.str1_size,
+        str2_size=header.str2_size,
+        entries=[
+            {"name": e.name, "locals": e.locals_count, "params": e.param_count, "flag0c": fmt_u32(e.flag0c)}
+            for e in entries
+        ],
+    )
+    return row
+
+
+def _info_dir(root: Path, out_path: Optional[Path], jobs: int) -> int:
+    tasks = [(root, p) for p in sorted(root.rglob("*.asb"))]
+    t0 = time.perf_counter()
+    if jobs <= 1 or len(tasks) <= 1:
+        rows = [_info_one(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            rows = list(ex.map(_info_one, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+    elapsed = time.perf_counter() - t0
+
+    if out_path is not None and out_path.suffix.lower() == ".json":
         out_path.parent.mkdir(parents=True, exist_ok=True)
-        encode_txt_to_asb(p, out_path)
+        out_path.write_text(json.dumps(rows, ensure_ascii=False, indent=2), encoding="utf-8")
+    else:
+        # CSV 一个文件一行，入口名用 ; 连接，方便 grep / 表格里筛选
+        with contextlib.ExitStack() as stack:
+            if out_path is None:
+                f: TextIO = sys.stdout
+            else:
+                out_path.parent.mkdir(parents=True, exist_ok=True)
+                f = stack.enter_context(open(out_path, "w", encoding="utf-8-sig", newline=""))
+            w = csv.DictWriter(f, fieldnames=_INFO_FIELDS)
+            w.writeheader()
+            for r in rows:
+                w.writerow({**r, "entries": ";".join(e["name"] for e in r.get("entries", []))})
+
+    errors = [r for r in rows if r.get("error")]
+    for r in errors:
+        print(f"[ERROR] {r['file']}: {r['error']}", file=sys.stderr)
+    tag = "[WARN]" if errors else "[OK]"
+    print(f"{tag} 读取 {len(rows)} 个文件头，{elapsed:.2f} s（jobs={jobs}），失败 {len(errors)}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+@dataclass
+class CliOptions:
+    jobs: int
+    force: bool = False
+    strict: bool = False
+    pack_strings: bool = False
+
+
+def _pop_options(argv: Sequence[str]) -> Tuple[List[str], CliOptions]:
+    rest: List[str] = []
+    opts = CliOptions(jobs=os.cpu_count() or 1)
+    it = iter(argv)
+    for a in it:
+        if a == "--force":
+            opts.force = True
+        elif a == "--strict":
+            opts.strict = True
+        elif a == "--pack-strings":
+            opts.pack_strings = True
+        elif a in {"-j", "--jobs"}:
+            v = next(it, None)
+            if v is None:
+                raise ValueError(f"{a} 缺少参数")
+            opts.jobs = int(v, 10)
+        elif a.startswith("--jobs="):
+            opts.jobs = int(a.split("=", 1)[1], 10)
+        else:
+            rest.append(a)
+    opts.jobs = max(1, opts.jobs)
+    return rest, opts
+
+
+_USAGE = (
+    "用法: python asb.py d/e <input> <output> [--jobs N] [--force] [--pack-strings]\n"
+    "      python asb.py verify <asb目录> [report.json] [--jobs N] [--strict] [--pack-strings]\n"
+    "        --pack-strings：另外按尾部共享打包、再解码，检查与原文件逐行一致\n"
+    "      python asb.py info <asb目录> [清单.csv|清单.json] [--jobs N]   只读文件头和入口表，不解码代码"
+)
 
 
 def main(argv: Sequence[str]) -> int:
+    try:
+        argv, opts = _pop_options(argv)
+    except ValueError as e:
+        print(f"参数错误: {e}", file=sys.stderr)
+        return 2
+    jobs = opts.jobs
+
+    if len(argv) >= 3 and argv[1].strip().lower() == "verify" and len(argv) <= 4:
+        report_path = Path(argv[3]) if len(argv) == 4 else None
+        return _verify_dir(Path(argv[2]), report_path, jobs, opts.strict, opts.pack_strings)
+
+    if len(argv) >= 3 and argv[1].strip().lower() == "info" and len(argv) <= 4:
+        out_path = Path(argv[3]) if len(argv) == 4 else None
+        return _info_dir(Path(argv[2]), out_path, jobs)
+
     if len(argv) != 4:
-        print("用法: python asb.py d/e <input> <output>", file=sys.stderr)
+        print(_USAGE, file=sys.stderr)
         return 2
 
     mode = argv[1].strip().lower()
@@ -953,22 +1701,22 @@ def main(argv: Sequence[str]) -> int:
     output_path = Path(argv[3])
 
     if mode not in {"d", "e"}:
-        print("模式必须是 d 或 e", file=sys.stderr)
+        print("模式必须是 d、e、verify 或 info", file=sys.stderr)
         return 2
 
     if mode == "d":
         if input_path.is_dir():
             output_path.mkdir(parents=True, exist_ok=True)
-            _decode_dir(input_path, output_path)
-        else:
-            decode_asb_to_txt(input_path, output_path)
+            return _decode_dir(input_path, output_path, jobs)
+        decode_asb_to_txt(input_path, output_path)
         return 0
 
     if input_path.is_dir():
         output_path.mkdir(parents=True, exist_ok=True)
-        _encode_dir(input_path, output_path)
-    else:
-        encode_txt_to_asb(input_path, output_path)
+        return _encode_dir(input_path, output_path, jobs, opts.force, opts.pack_strings)
+    saved = encode_txt_to_asb(input_path, output_path, pack_strings=opts.pack_strings)
+    if opts.pack_strings:
+        print(f"[PACK] {input_path}: 字符串池节省 {saved} 字节", file=sys.stderr)
     return 0
 
 
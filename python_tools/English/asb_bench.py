@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import asb
+
+
+def _resolve_linear(index: asb.CStringIndex, region: asb.Buffer, off: int) -> Optional[asb.CStringInfo]:
+    # 逐项扫描的参照实现，作为对照基准；落在字符串中间的指针解析成从该处开始的后缀
+    if off < 0 or off >= len(region):
+        return None
+    for it in index.items:
+        if it.start <= off <= it.end:
+            if off in (it.start, it.end):
+                return it
+            return asb.CStringInfo(start=off, end=it.end, text=asb.decode_text(bytes(region[off:it.end])))
+    return None
+
+
+def _collect_pointers(file_bytes: bytes) -> Tuple[bytes, bytes, List[int], List[int]]:
+    # 收集 apply_string_mappings 实际会查的指针：入口名 / JMPG / CALLG / 所有 PUSHI 立即数
+    header = asb.parse_asb_header(file_bytes)
+    entries = asb.parse_entry_table(header, file_bytes)
+    code_start, code_end = asb._region_bounds(len(file_bytes), header.code_off, header.code_size)
+    str1 = asb._slice_region(file_bytes, header.str1_off, header.str1_size)
+    str2 = asb._slice_region(file_bytes, header.str2_off, header.str2_size)
+
+    offs1: List[int] = [e.name_off for e in entries]
+    offs2: List[int] = []
+    names = [op.name for op in asb._OPCODE_TABLE]
+    for opcode, _, values in asb.decode_code_raw(file_bytes, start=code_start, end=code_end):
+        name = names[opcode]
+        if name == "PUSHI":
+            offs1.append(values[0])
+        elif name in {"JMPG", "CALLG"}:
+            offs2.append(values[0])
+            offs1.append(values[1])
+    return str1, str2, offs1, offs2
+
+
+def bench_resolve(paths: Sequence[Path], rounds: int) -> int:
+    total_old = 0.0
+    total_new = 0.0
+    total_lookups = 0
+    mismatches = 0
+
+    for p in paths:
+        str1, str2, offs1, offs2 = _collect_pointers(p.read_bytes())
+        for region, offs in ((str1, offs1), (str2, offs2)):
+            index = asb.CStringIndex(region)
+
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                old = [_resolve_linear(index, region, off) for off in offs]
+            t1 = time.perf_counter()
+            for _ in range(rounds):
+                new = [index.resolve(off) for off in offs]
+            t2 = time.perf_counter()
+
+            total_old += t1 - t0
+            total_new += t2 - t1
+            total_lookups += len(offs) * rounds
+            mismatches += sum(1 for a, b in zip(old, new) if a != b)
+
+        print(f"{p.name}: {len(offs1)} STRINGS_1 / {len(offs2)} STRINGS_2 查询")
+
+    speedup = total_old / total_new if total_new > 0 else float("inf")
+    print(f"查询次数: {total_lookups}")
+    print(f"线性扫描: {total_old * 1000:.1f} ms")
+    print(f"二分索引: {total_new * 1000:.1f} ms  (x{speedup:.1f})")
+    if mismatches:
+        print(f"[ERROR] 结果不一致: {mismatches} 处", file=sys.stderr)
+        return 1
+    print("结果一致")
+    return 0
+
+
+# -------- 基准套件 --------
+
+def _peak_rss_kb() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位是 KiB，macOS 是字节
+        return peak // 1024 if sys.platform == "darwin" else peak
+    if os.name == "nt":
+        import ctypes
+        from ctypes import wintypes
+
+        class _Counters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        c = _Counters()
+        c.cb = ctypes.sizeof(c)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(c), c.cb):
+            return c.PeakWorkingSetSize // 1024
+    return None
+
+
+def _stage_parse_code(files: Sequence[Path], _: Path) -> Tuple[float, int]:
+    elapsed = 0.0
+    total = 0
+    for p in files:
+        data = p.read_bytes()
+        header = asb.parse_asb_header(data)
+        start, end = asb._region_bounds(len(data), header.code_off, header.code_size)
+        t0 = time.perf_counter()
+        asb.parse_code(data, asb._OPCODE_TABLE, start=start, end=end)
+        elapsed += time.perf_counter() - t0
+        total += end - start
+    return elapsed, total
+
+
+def _stage_apply_string_mappings(files: Sequence[Path], _: Path) -> Tuple[float, int]:
+    str_cfg = asb.load_str_config_from_embedded_json()
+    elapsed = 0.0
+    total = 0
+    for p in files:
+        data = p.read_bytes()
+        header = asb.parse_asb_header(data)
+        entries = asb.parse_entry_table(header, data)
+        start, end = asb._region_bounds(len(data), header.code_off, header.code_size)
+        str1_index = asb.CStringIndex(asb._slice_region(data, header.str1_off, header.str1_size))
+        str2_index = asb.CStringIndex(asb._slice_region(data, header.str2_off, header.str2_size))
+        insns = asb.parse_code(data, asb._OPCODE_TABLE, start=start, end=end)
+        t0 = time.perf_counter()
+        asb.apply_string_mappings(insns, str1_index, str2_index, [e.name_off for e in entries], str_cfg)
+        elapsed += time.perf_counter() - t0
+        total += end - start
+    return elapsed, total
+
+
+def _stage_decode(files: Sequence[Path], tmp: Path) -> Tuple[float, int]:
+    t0 = time.perf_counter()
+    for p in files:
+        asb.decode_asb_to_txt(p, tmp / p.with_suffix(".txt").name)
+    return time.perf_counter() - t0, sum(p.stat().st_size for p in files)
+
+
+def _stage_encode(files: Sequence[Path], tmp: Path) -> Tuple[float, int]:
+    txts = []
+    for p in files:
+        t = tmp / p.with_suffix(".txt").name
+        asb.decode_asb_to_txt(p, t)
+        txts.append(t)
+    t0 = time.perf_counter()
+    for t in txts:
+        asb.encode_txt_to_asb(t, tmp / t.with_suffix(".asb").name)
+    return time.perf_counter() - t0, sum(t.stat().st_size for t in txts)
+
+
+_STAGES = {
+    "parse_code": _stage_parse_code,
+    "apply_string_mappings": _stage_apply_string_mappings,
+    "decode_asb_to_txt": _stage_decode,
+    "encode_txt_to_asb": _stage_encode,
+}
+
+
+def _run_stage(name: str, files: Sequence[Path]) -> Dict[str, Any]:
+    # 每个阶段在独立的子进程里跑，峰值 RSS 才能按阶段区分
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stderr(io.StringIO()):
+        elapsed, total = _STAGES[name](files, Path(tmp))
+    return {
+        "files": len(files),
+        "bytes": total,
+        "seconds": round(elapsed, 4),
+        "files_per_s": round(len(files) / elapsed, 2) if elapsed > 0 else None,
+        "mb_per_s": round(total / (1024 * 1024) / elapsed, 3) if elapsed > 0 else None,
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+
+
+def bench_suite(files: Sequence[Path], out_json: Optional[Path], baseline: Optional[Path]) -> int:
+    ctx = multiprocessing.get_context("spawn")
+    stages: Dict[str, Any] = {}
+    for name in _STAGES:
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as ex:
+            stages[name] = ex.submit(_run_stage, name, list(files)).result()
+
+    result = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": {"files": len(files), "bytes": sum(p.stat().st_size for p in files)},
+        "stages": stages,
+    }
+
+    old: Dict[str, Any] = {}
+    if baseline is not None:
+        old = json.loads(baseline.read_text(encoding="utf-8")).get("stages", {})
+
+    print(f"{'阶段':<24}{'秒':>10}{'文件/s':>10}{'MB/s':>10}{'峰值RSS(KiB)':>14}  对比基线")
+    for name, r in stages.items():
+        cmp = ""
+        prev = old.get(name)
+        if prev and prev.get("seconds") and r["seconds"]:
+            cmp = f"x{prev['seconds'] / r['seconds']:.2f}"
+        rss = r["peak_rss_kb"] if r["peak_rss_kb"] is not None else "-"
+        print(f"{name:<24}{r['seconds']:>10.3f}{r['files_per_s'] or 0:>10.1f}{r['mb_per_s'] or 0:>10.2f}{rss:>14}  {cmp}")
+
+    if out_json is not None:
+        out_json.parent.mkdir(parents=True, exist_ok=True)
+        out_json.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"[OK] 结果已写入 {out_json}", file=sys.stderr)
+    return 0
+
+
+def _find_asb(root: Path) -> List[Path]:
+    return sorted(root.rglob("*.asb"), key=lambda p: p.stat().st_size, reverse=True)
+
+
+_USAGE = (
+    "用法:\n"
+    "  python asb_bench.py resolve <adv/scn 目录> [取最大的文件数=10] [轮数=3]\n"
+    "  python asb_bench.py suite <asb 目录> [结果.json] [基线.json]\n"
+    "\n"
+    "没有真实脚本时可以先用 asb_synth.py 生成合成语料。"
+)
+
+
+def main(argv: Sequence[str]) -> int:
+    if len(argv) < 3 or argv[1] not in {"resolve", "suite"}:
+        print(_USAGE, file=sys.stderr)
+        return 2
+
+    cmd = argv[1]
+    files = _find_asb(Path(argv[2]))
+    if not files:
+        print(f"找不到 .asb: {argv[2]}", file=sys.stderr)
+        return 2
+
+    if cmd == "resolve":
+        top = int(argv[3]) if len(argv) >= 4 else 10
+        rounds = int(argv[4]) if len(argv) >= 5 else 3
+        return bench_resolve(files[:top], rounds)
+
+    out_json = Path(argv[3]) if len(argv) >= 4 else None
+    baseline = Path(argv[4]) if len(argv) >= 5 else None
+    return bench_suite(files, out_json, baseline)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# 生成合成 ASB 语料：结构与 adv/scn 脚本一致（入口表、分支密集的代码、CALLB 字符串参数、
+# STRINGS_1/2 字符串池），内容随机。用于在没有游戏原始脚本的环境里做性能测试。
+
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import asb
+
+_KANA = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+_KATA = "アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモラリルレロン"
+_KANJI = "銀河天使艦隊司令官紋章機皇国本日出撃任務報告確認了解大丈夫何事私貴方"
+_PUNCT = "、。！？…「」"
+
+_OP: Dict[str, int] = {op.name: i for i, op in enumerate(asb._OPCODE_TABLE)}
+
+
+class _Pool:
+    # 按插入顺序拼接的 \0 结尾字符串池；相同文本复用 offset
+    def __init__(self) -> None:
+        self.buf = bytearray()
+        self.offs: Dict[str, int] = {}
+
+    def add(self, s: str) -> int:
+        off = self.offs.get(s)
+        if off is None:
+            off = len(self.buf)
+            self.buf.extend(asb.encode_text(s))
+            self.buf.append(0)
+            self.offs[s] = off
+        return off
+
+
+class _Code:
+    def __init__(self) -> None:
+        self.buf = bytearray()
+        self.starts: List[int] = []
+
+    def op(self, name: str, *operands: bytes) -> None:
+        self.starts.append(len(self.buf))
+        self.buf.append(_OP[name])
+        for b in operands:
+            self.buf.extend(b)
+
+
+def _u32(n: int) -> bytes:
+    return asb._pack_u32(n)
+
+
+def _u8(n: int) -> bytes:
+    return asb._pack_u8(n)
+
+
+def _line(rnd: random.Random) -> str:
+    chars = _KANA * 3 + _KATA + _KANJI * 2
+    n = rnd.randrange(4, 40)
+    s = "".join(rnd.choice(chars) for _ in range(n)) + rnd.choice(_PUNCT)
+    if rnd.random() < 0.25:
+        s += "\n" + "".join(rnd.choice(chars) for _ in range(rnd.randrange(3, 20)))
+    return s
+
+
+def _target(rnd: random.Random, code: _Code) -> int:
+    return rnd.choice(code.starts) if code.starts else 0
+
+
+def build_synthetic_asb(filename: str, blocks: int, seed: int) -> bytes:
+    rnd = random.Random(seed)
+    str1 = _Pool()
+    str2 = _Pool()
+    code = _Code()
+
+    func_names = [f"func{i:02d}" for i in range(rnd.randrange(3, 12))] + ["__main"]
+    name_offs = [str1.add(n) for n in func_names]
+    scripts = [f"scn{i:03d}.asb" for i in range(32)]
+    # 常用台词（系统提示、固定反应）在同一文件里重复出现，让字符串池有复用
+    stock = [_line(rnd) for _ in range(16)]
+
+    for _ in range(blocks):
+        r = rnd.random()
+        if r < 0.35:
+            # 对白：CALLB 0x13 设置说话人，然后 CALLB 0x00 显示文本
+            code.op("PUSHI", _u32(rnd.randrange(1, 60) | (rnd.randrange(0, 3) << 16)))
+            code.op("PUSHI", _u32(rnd.randrange(0, 40)))
+            code.op("PUSHI", _u32(rnd.choice([0xFFFFFFFF, rnd.randrange(0, 5000)])))
+            code.op("CALLB", _u32(0x13), _u8(3))
+            r2 = rnd.random()
+            if r2 < 0.2:
+                text = rnd.choice(stock)
+            elif r2 < 0.3:
+                # 常用台词的后半句单独出现：--pack-strings 会把它指到整句的中间，verify --pack-strings 检查解码结果
+                s = rnd.choice(stock)
+                text = s[rnd.randrange(1, len(s)):]
+            else:
+                text = _line(rnd)
+            code.op("PUSHI", _u32(str1.add(text)))
+            code.op("CALLB", _u32(0x00), _u8(1))
+        elif r < 0.45:
+            # 选项：字符串参数前用 NOP 断开，避免与前面的整数 PUSH 连成一串
+            n = rnd.randrange(2, 5)
+            code.op("NOP")
+            for _ in range(n):
+                code.op("PUSHI", _u32(str1.add(_line(rnd))))
+            code.op("PUSHL", _u8(rnd.randrange(0, 8)))
+            code.op("CALLB", _u32(0x01), _u8(n + 1))
+        elif r < 0.70:
+            # 分支密集的条件判断
+            code.op("PUSHL", _u8(rnd.randrange(0, 16)))
+            code.op("PUSHI", _u32(rnd.randrange(0, 100)))
+            code.op(rnd.choice(["EQ", "NEQ", "LT", "GT", "LEQ", "GEQ"]))
+            code.op(rnd.choice(["BZ", "BNZ"]), _u32(_target(rnd, code)))
+            if rnd.random() < 0.3:
+                code.op("PUSHG", _u32(rnd.randrange(0, 0x400)))
+                k = rnd.randrange(1, 8)
+                code.op("BTBL", _u8(k), *[_u32(_target(rnd, code)) for _ in range(k)])
+            code.op("B", _u32(_target(rnd, code)))
+        elif r < 0.78:
+            script = rnd.choice(scripts)
+            func = rnd.choice(func_names)
+            if rnd.random() < 0.5:
+                code.op("JMPG", _u32(str2.add(script)), _u32(str1.add(func)))
+            else:
+                code.op("PUSHI", _u32(rnd.randrange(0, 10)))
+                code.op("CALLG", _u32(str2.add(script)), _u32(str1.add(func)), _u8(1))
+        elif r < 0.92:
+            code.op("PUSHG", _u32(rnd.randrange(0, 0x400)))
+            code.op("PUSHF", _u32(rnd.randrange(0, 0x100)))
+            code.op(rnd.choice(["ADD", "SUB", "MUL", "AND", "OR"]))
+            code.op("POPG", _u32(rnd.randrange(0, 0x400)))
+            code.op("STIL", _u32(rnd.randrange(0, 100)), _u8(rnd.randrange(0, 16)))
+            code.op(rnd.choice(["INCL", "DECL"]), _u8(rnd.randrange(0, 16)))
+        else:
+            code.op("PUSHI", _u32(rnd.randrange(0, 1000)))
+            code.op("CALLB", _u32(rnd.randrange(0x03, 0x80)), _u8(1))
+            code.op("PUSHR")
+            code.op("POP")
+            code.op(rnd.choice(["YIELD", "RET", "NOP"]))
+
+    entry_table = bytearray()
+    for i, name_off in enumerate(name_offs):
+        locals_count = rnd.randrange(0, 16)
+        param_count = rnd.randrange(0, 4)
+        flag0c = 1 if i == len(name_offs) - 1 else 0
+        entry_table.extend(_u32(name_off))
+        entry_table.extend(_u32(_target(rnd, code)))
+        entry_table.extend(_u32(locals_count | (param_count << 16)))
+        entry_table.extend(_u32(flag0c))
+        entry_table.extend(_u32(0))
+
+    return asb.build_asb_bytes(
+        filename=filename,
+        entry_table_bytes=bytes(entry_table),
+        entry_count=len(name_offs),
+        code_bytes=bytes(code.buf),
+        str1_bytes=bytes(str1.buf),
+        str2_bytes=bytes(str2.buf),
+    )
+
+
+def generate_corpus(out_dir: Path, files: int, blocks: int, seed: int = 0) -> List[Path]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths: List[Path] = []
+    for i in range(files):
+        name = f"syn{i:04d}.asb"
+        # 文件大小在 blocks 的 1/4 ~ 2 倍之间浮动，接近真实语料里大小不一的分布
+        n = max(1, int(blocks * random.Random(seed * 100003 + i).uniform(0.25, 2.0)))
+        p = out_dir / name
+        p.write_bytes(build_synthetic_asb(name, n, seed * 100003 + i))
+        paths.append(p)
+    return paths
+
+
+def main(argv: Sequence[str]) -> int:
+    if len(argv) < 2:
+        print("用法: python asb_synth.py <输出目录> [文件数=50] [每文件平均块数=2000] [seed=0]", file=sys.stderr)
+        return 2
+    out_dir = Path(argv[1])
+    files = int(argv[2]) if len(argv) >= 3 else 50
+    blocks = int(argv[3]) if len(argv) >= 4 else 2000
+    seed = int(argv[4]) if len(argv) >= 5 else 0
+
+    paths = generate_corpus(out_dir, files, blocks, seed)
+    total = sum(p.stat().st_size for p in paths)
+    print(f"[OK] 生成 {len(paths)} 个文件，共 {total / (1024 * 1024):.2f} MB -> {out_dir}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
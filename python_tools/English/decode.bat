@@ -10,7 +10,6 @@ if not exist extract\ (
 set "TOOLSDIR=%~dp0"
 
 python %TOOLSDIR%tbl.py d extract Raw\TBL.json
-python %TOOLSDIR%asb.py d extract\adv\scn Raw\TXT
-python %TOOLSDIR%textjson.py d Raw\TXT Raw\asb extract
+python %TOOLSDIR%textjson_EN.py da extract\adv\scn Raw\asb extract
 python %TOOLSDIR%roll.py d extract\adv Raw\staff
 python %TOOLSDIR%demo.py d extract Raw\demo
\ No newline at end of file
@@ -2,6 +2,7 @@ import os, sys, json, struct, re
 from pathlib import Path
 from collections import deque
 from char import encode_cp932_or_die, make_translation_converter
+import textJson_EN as textJson
 
 def u32(b, o): return struct.unpack_from("<I", b, o)[0]
 def u16(b, o): return struct.unpack_from("<H", b, o)[0]
@@ -171,7 +172,8 @@ if __name__ == "__main__":
         if not adv_dir.exists(): raise SystemExit(f"[ERR] adv not found: {adv_dir}")
         if not voicetbl_dir.exists(): raise SystemExit(f"[ERR] voicetbl not found: {voicetbl_dir}")
 
-        names, _ = textJson.load_char_names(adv_dir)
+        # 与 textJson d/da 一样，char*.tbl 的解析结果缓存在 JSON 输出目录里
+        names, _ = textJson.load_char_names(adv_dir, cache_dir=out_dir)
 
         cnt = 0
         for dat_path, stage_id in iter_opdemo(extract_dir):
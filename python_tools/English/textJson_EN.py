@@ -1,35 +1,39 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import hashlib
 import json
+import os
 import re
+import struct
 import sys
+import time
+import zlib
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-from wcwidth import wcswidth
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import asb
+import char
 from char import encode_cp932_or_die, make_translation_converter
 
 IMG_BASE = "https://ga2.wbnb.top/face"
 VOICE_BASE = "https://ga2.wbnb.top/advvoice"
 
-PUSHI_RE = re.compile(r"^\s*PUSHI\s+([0-9A-Fa-f]{8})\s*$")
-PUSHL_RE = re.compile(r"^\s*PUSHL\s+([0-9A-Fa-f]{2})\s*$")
-PUSHG_RE = re.compile(r"^\s*PUSHG\s+([0-9A-Fa-f]{8})\s*$")
-PUSHF_RE = re.compile(r"^\s*PUSHF\s+([0-9A-Fa-f]{8})\s*$")
+HEX2_RE = re.compile(r"[0-9A-Fa-f]{2}")
+HEX8_RE = re.compile(r"[0-9A-Fa-f]{8}")
+CALL_ARGS_RE = re.compile(r"([0-9A-Fa-f]{2}),\s*([0-9A-Fa-f]{8})")
 
-CALLB_RE = re.compile(r"^\s*CALLB\s+([0-9A-Fa-f]{2}),\s*([0-9A-Fa-f]{8})\s*$")
-CALLI_RE = re.compile(r"^\s*CALLI\s+([0-9A-Fa-f]{2}),\s*([0-9A-Fa-f]{8})\s*$")
-CALLL_RE = re.compile(r"^\s*CALLL\s+([0-9A-Fa-f]{2}),\s*([0-9A-Fa-f]{8})\s*$")
-CALLG_RE = re.compile(r"^\s*CALLG\s+([0-9A-Fa-f]{2}),\s*([0-9A-Fa-f]{8})\s*$")
-
-OTHER_OP_RE = re.compile(
-    r"^\s*(?:"
-    r"NOP|PUSHR|POP|POPL|POPG|POPF|STIL|STIG|STIF|INCL|DECL|INCG|DECG|EXCH|NEG|"
-    r"ADD|SUB|MUL|DIV|MOD|AND|OR|NOT|EQ|NEQ|LT|GT|LEQ|GEQ|"
-    r"B|BZ|BNZ|BTBL|JMPL|JMPG|CALLL|CALLG|RET|RETN|YIELD"
-    r")\b"
-)
+# 只有栈效果（或者什么都不做）的指令
+OTHER_OPS = frozenset((
+    "NOP", "PUSHR", "POP", "POPL", "POPG", "POPF", "STIL", "STIG", "STIF", "INCL", "DECL", "INCG", "DECG", "EXCH", "NEG",
+    "ADD", "SUB", "MUL", "DIV", "MOD", "AND", "OR", "NOT", "EQ", "NEQ", "LT", "GT", "LEQ", "GEQ",
+    "B", "BZ", "BNZ", "BTBL", "JMPL", "JMPG", "CALLL", "CALLG", "RET", "RETN", "YIELD",
+))
+# 行首 token 不完全等于指令名、但以指令名 + 非单词字符开头（如 "NOP,"）时也算指令行
+OTHER_OP_RE = re.compile(r"(?:" + "|".join(sorted(OTHER_OPS)) + r")\b")
 
 TBL_FILE_RE = re.compile(r"^char(\d{3})\.tbl$", re.IGNORECASE)
 ID_RE = re.compile(r"^\s*ID\s*=\s*(\d+)\s*$", re.IGNORECASE)
@@ -41,114 +45,175 @@ FACE_MAP_RE = re.compile(r"^\s*#\s*([0-9A-Fa-f]+)\s*=\s*([^\s;\/]+)")
 HEX_KEY_RE = re.compile(r"^\s*([0-9A-Fa-f]+)")          # key 前导 hex
 PAREN_COMMENT_RE = re.compile(r"\([^)]*\)")
 
+# wrap_text 用的正则与避头字符
+WRAP_CTRL_RE = re.compile(r"\\(?:c[0-9A-Fa-f]{8}|s\d{2}|v\d+)")      # 控制序列，不占宽度
+WRAP_HEAD_NG = frozenset(".,!?;:)]}、。，．！？；：）」』】〉》〔〕〗】』」…〜~")
+WRAP_TOK_RE = re.compile(r"\s+|[A-Za-z0-9]+(?:[A-Za-z0-9'_-]*[A-Za-z0-9]+)?|.")
+WRAP_NL_RE = re.compile(r"\s*\\n\s*")
+CUT_SENTENCE_RE = re.compile(r"(?:\.\.\.|…|[。！？]|[!?！？]+)(?=\s|$)")
+CUT_WEAK_RE = re.compile(r"[,;:](?=\s|$)")
+CUT_SPACE_RE = re.compile(r"\s+(?=\S|$)")
+
+WRAP_LIMIT_CELLS = 44         # 对话框一行的半角格数
+WRAP_MIN_LINE_CELLS = 6       # punc 断行时前半行短于这个宽度就改按塞满断
+
+@lru_cache(maxsize=None)
+def game_cells(ch: str) -> int:
+    # 游戏按码逐字画固定大小的 tile，字形宽窄不影响步进：wrap_text 看到的是 conv 之后的写回文本，
+    # 编成双字节 cp932 的字（font.tbl 的代理字、原字库的假名汉字）占一个 tile（2 格），
+    # 单字节的（ASCII、半角片假名）占半个（1 格）；编不成 cp932 的字写回时会变成 ?，按 1 格
+    try:
+        return len(ch.encode("cp932"))
+    except UnicodeEncodeError:
+        return 1
+
+class PrefixWidths:
+    # 整句只算一遍逐字符格数的前缀和，之后任意 s[a:b] 的宽度都是 O(1)，等于去掉控制序列后逐字 game_cells 之和。
+    # 子串只截到控制序列的一部分（断在 "\" 之后）时，截到的那部分没有被去掉，照常计宽
+    def __init__(self, s: str) -> None:
+        n = len(s)
+        self.ctrl_start = [-1] * n
+        self.ctrl_end = [-1] * n
+        for m in WRAP_CTRL_RE.finditer(s):
+            for i in range(m.start(), m.end()):
+                self.ctrl_start[i] = m.start()
+                self.ctrl_end[i] = m.end()
+
+        self.raw = [game_cells(ch) for ch in s]
+        self.cells = [0] * (n + 1)
+        c = 0
+        for i, cw in enumerate(self.raw):
+            if self.ctrl_start[i] < 0:
+                c += cw
+            self.cells[i + 1] = c
+
+    def seg(self, a: int, b: int) -> int:
+        c = self.cells[b] - self.cells[a]
+        if a < b:
+            x = self.ctrl_start[a]
+            if 0 <= x < a:
+                c += sum(self.raw[a:min(self.ctrl_end[a], b)])
+            x = self.ctrl_start[b] if b < len(self.ctrl_start) else -1
+            if a <= x < b:
+                c += sum(self.raw[x:b])
+        return c
+
+# 不为 None 时 wrap_text 写的每条日志另外记一份 [tag, 记录]：ea 把它存进清单，跳过未变化的脚本时原样补写
+_wrap_log_capture: Optional[List[List[str]]] = None
+
+def _append_wrap_log(tag: str, record: str) -> None:
+    path = "wrap.log" if tag == "WRAP" else "overflow.log"
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(record)
+    if _wrap_log_capture is not None:
+        _wrap_log_capture.append([tag, record])
+
 def wrap_text(text: str, where: str) -> str:
     def log(tag: str, out: str) -> None:
-        path = "wrap.log" if tag == "WRAP" else "overflow.log"
-        with open(path, "a", encoding="utf-8") as f:
-            f.write(f"[{tag}] {where}\n{text}\n-> {out}\n---\n")
-
-    ctrl_re = re.compile(r"\\(?:c[0-9A-Fa-f]{8}|s\d{2}|v\d+)")
-    head_ng = set(".,!?;:)]}、。，．！？；：）」』】〉》〔〕〗】』」…〜~")
-    tok_re = re.compile(r"\s+|[A-Za-z0-9]+(?:[A-Za-z0-9'_-]*[A-Za-z0-9]+)?|.")
-
-    def vis(s: str) -> str:
-        return ctrl_re.sub("", s)
-
-    def w(s: str) -> int:
-        v = wcswidth(vis(s))
-        return v if v >= 0 else len(vis(s))
+        _append_wrap_log(tag, f"[{tag}] {where}\n{text}\n-> {out}\n---\n")
 
     def lim(_: int) -> int:
-        return 44
-
-    def tokens(s: str) -> List[str]:
-        return [m.group(0) for m in tok_re.finditer(s)]
-
-    def join_lstrip(toks: List[str]) -> str:
-        return "".join(toks).lstrip()
-
-    def join_rstrip(toks: List[str]) -> str:
-        return "".join(toks).rstrip()
-
-    def hang_kinsoku(line: str, rest_toks: List[str], lim0: int) -> Tuple[str, List[str]]:
-        rest = join_lstrip(rest_toks)
-        while rest and rest[0] in head_ng and w(line + rest[0]) <= lim0:
-            line += rest[0]
-            rest = rest[1:].lstrip()
-        return line, tokens(rest)
-
-    def last_end(pat: str, s: str) -> int:
+        return WRAP_LIMIT_CELLS
+
+    s = WRAP_NL_RE.sub(" ", text).strip()
+    n = len(s)
+
+    # 整句只切一次 token，之后都用 s 里的位置表示：剩余文本总是从某个 token 开头
+    starts: List[int] = []
+    ends: List[int] = []
+    for m in WRAP_TOK_RE.finditer(s):
+        starts.append(m.start())
+        ends.append(m.end())
+    ntok = len(starts)
+    tok_at = {p: i for i, p in enumerate(starts)}
+    ws = PrefixWidths(s)
+
+    def w(a: int, b: int) -> int:
+        return ws.seg(a, b)
+
+    def rstrip_end(a: int, b: int) -> int:
+        while b > a and s[b - 1].isspace():
+            b -= 1
+        return b
+
+    def lstrip_pos(p: int) -> int:
+        while p < n and s[p].isspace():
+            p += 1
+        return p
+
+    def last_end(pat: "re.Pattern[str]", a: int, b: int) -> int:
+        # 在 s[a:b] 中最后一次匹配的结束位置（相对 a），没有为 0
         m = None
-        for m in re.finditer(pat, s):
+        for m in pat.finditer(s, a, b):
             pass
-        return m.end() if m else 0
+        return m.end() - a if m else 0
 
-    def pos_to_idx(pos: int, cur: List[str]) -> int:
+    def pos_to_idx(pos: int, ti: int, j: int) -> int:
+        # 第 ti..j-1 个 token 里，累计长度首次 >= pos 时已用的 token 数
         if pos <= 0:
             return 0
-        acc = 0
-        for idx, t in enumerate(cur):
-            acc += len(t)
-            if acc >= pos:
-                return idx + 1
-        return len(cur)
-
-    def cut_idx(cur: List[str], mode: str) -> int:
-        s = join_rstrip(cur)
-        if not s:
+        k = bisect_left(ends, starts[ti] + pos, ti, j)
+        return k - ti + 1 if k < j else j - ti
+
+    def cut_idx(ti: int, j: int, mode: str) -> int:
+        a = starts[ti]
+        e = rstrip_end(a, ends[j - 1])
+        if e == a:
             return 0
 
         if mode == "fill":
-            cut_space = last_end(r"\s+(?=\S|$)", s)
-            return pos_to_idx(cut_space or len(s), cur)
-
-        cut_sentence = last_end(r"(?:\.\.\.|…|[。！？]|[!?！？]+)(?=\s|$)", s)
-        cut_weak = last_end(r"[,;:](?=\s|$)", s)
-        cut_space = last_end(r"\s+(?=\S|$)", s)
-        return pos_to_idx(cut_sentence or cut_weak or cut_space, cur)
+            cut_space = last_end(CUT_SPACE_RE, a, e)
+            return pos_to_idx(cut_space or e - a, ti, j)
+
+        cut_sentence = last_end(CUT_SENTENCE_RE, a, e)
+        cut_weak = last_end(CUT_WEAK_RE, a, e)
+        cut_space = last_end(CUT_SPACE_RE, a, e)
+        return pos_to_idx(cut_sentence or cut_weak or cut_space, ti, j)
+
+    def hang_kinsoku(a: int, e: int, p: int, lim0: int) -> Tuple[str, int]:
+        # 行为 s[a:e]，剩余文本从 p 开始；紧跟着的避头字符挂到行尾（中间空白丢掉）
+        line = s[a:e]
+        lw = ws.seg(a, e)
+        p = lstrip_pos(p)
+        while p < n and s[p] in WRAP_HEAD_NG:
+            cand = lw + ws.seg(p, p + 1)
+            if cand > lim0:
+                break
+            line += s[p]
+            lw = cand
+            p = lstrip_pos(p + 1)
+        return line, p
 
-    def step(toks: List[str], mode: str, line_idx: int) -> Tuple[str, List[str]]:
+    def step(ti: int, mode: str, line_idx: int) -> Tuple[str, int]:
+        # 从第 ti 个 token 起排一行，返回 (这一行, 剩余文本的第一个 token；排完为 ntok)
         lim0 = lim(line_idx)
+        a = starts[ti]
 
-        cur: List[str] = []
-        j = 0
-        while j < len(toks):
-            cand = "".join(cur) + toks[j]
-            if not cur:
-                cur = [toks[j].lstrip()]
-                j += 1
-                continue
-            if w(cand) <= lim0:
-                cur.append(toks[j])
-                j += 1
-            else:
-                break
+        j = ti + 1
+        while j < ntok and w(a, ends[j]) <= lim0:
+            j += 1
 
-        if j >= len(toks):
-            return join_rstrip(cur), []
+        if j >= ntok:
+            return s[a:rstrip_end(a, n)], ntok
 
-        cut = cut_idx(cur, mode) or (cut_idx(cur, "fill") or len(cur))
-        if mode == "punc" and w(join_rstrip(cur[:cut])) < 6:
-            cut = cut_idx(cur, "fill") or len(cur)
-        line = join_rstrip(cur[:cut])
-        rest = cur[cut:] + toks[j:]
-        line, rest = hang_kinsoku(line, rest, lim0)
-        return line, rest
+        cut = cut_idx(ti, j, mode) or (cut_idx(ti, j, "fill") or j - ti)
+        if mode == "punc" and w(a, rstrip_end(a, ends[ti + cut - 1])) < WRAP_MIN_LINE_CELLS:
+            cut = cut_idx(ti, j, "fill") or j - ti
+        line, p = hang_kinsoku(a, rstrip_end(a, ends[ti + cut - 1]), starts[ti + cut], lim0)
+        return line, tok_at[p] if p < n else ntok
 
-    def simulate(toks: List[str], mode: str) -> Tuple[bool, List[str]]:
+    def simulate(mode: str) -> Tuple[bool, List[str]]:
         out: List[str] = []
+        ti = 0
         for line_idx in range(3):
-            if not toks:
+            if ti >= ntok:
                 break
-            line, toks = step(toks, mode, line_idx)
+            line, ti = step(ti, mode, line_idx)
             out.append(line)
-        return bool(toks), out  # overflow?, lines
-
-    s = re.sub(r"\s*\\n\s*", " ", text).strip()
-    toks0 = tokens(s)
+        return ti < ntok, out  # overflow?, lines
 
-    overflow_p, out_p = simulate(toks0[:], "punc")
-    overflow_f, out_f = simulate(toks0[:], "fill")
+    overflow_p, out_p = simulate("punc")
+    overflow_f, out_f = simulate("fill")
 
     if overflow_p and not overflow_f:
         res = "\\n".join(out_f)
@@ -191,19 +256,42 @@ def is_section_header(line: str) -> bool:
     t = line.strip()
     return t.startswith("[") and t.endswith("]")
 
+# 行首 token -> 操作数的预编译正则（对 token 之后的部分整段 fullmatch）。不匹配时这一行再按其它规则判断：
+# PUSHI/CALLB 等写错了就当文本，CALLL/CALLG 仍算 OTHER_OPS
+OPERAND_RES: Dict[str, "re.Pattern[str]"] = {
+    "PUSHI": HEX8_RE,
+    "PUSHL": HEX2_RE,
+    "PUSHG": HEX8_RE,
+    "PUSHF": HEX8_RE,
+    "CALLB": CALL_ARGS_RE,
+    "CALLI": CALL_ARGS_RE,
+    "CALLL": CALL_ARGS_RE,
+    "CALLG": CALL_ARGS_RE,
+}
+
+def split_op(t: str) -> Tuple[str, str]:
+    # t 是 strip 过的非空行。asb.py 写出的指令行都用单个空格分隔，先按空格切；
+    # token 里还有其它空白（isprintable() 为假）时退回 split()
+    op, _, rest = t.partition(" ")
+    if op.isprintable():
+        return op, rest.lstrip()
+    parts = t.split(None, 1)
+    return parts[0], parts[1] if len(parts) == 2 else ""
+
+def is_op_line(t: str) -> bool:
+    op, rest = split_op(t)
+    pat = OPERAND_RES.get(op)
+    if pat is not None and pat.fullmatch(rest):
+        return True
+    return op in OTHER_OPS or OTHER_OP_RE.match(op) is not None
+
 def is_text_param_line(line: str) -> bool:
     t = line.strip()
     if not t:
         return False
     if t.startswith("[") or t.startswith("@") or t.startswith("__"):
         return False
-    if PUSHI_RE.match(t) or PUSHL_RE.match(t) or PUSHG_RE.match(t) or PUSHF_RE.match(t):
-        return False
-    if CALLB_RE.match(t) or CALLI_RE.match(t) or CALLL_RE.match(t) or CALLG_RE.match(t):
-        return False
-    if OTHER_OP_RE.match(t):
-        return False
-    return True
+    return not is_op_line(t)
 
 def key_from_codeline(code_line: int) -> str:
     return format(max(code_line, 0), "X").upper()
@@ -229,8 +317,12 @@ def read_text_guess(p: Path) -> str:
 def iter_txt_files(root: Path) -> List[Path]:
     return sorted([p for p in root.rglob("*.txt") if p.is_file()])
 
+def iter_asb_files(root: Path) -> List[Path]:
+    return sorted([p for p in root.rglob("*.asb") if p.is_file()])
+
 def iter_json_files(root: Path) -> List[Path]:
-    return sorted([p for p in root.rglob("*.json") if p.is_file()])
+    # 跳过 d/da 写在 JSON 目录里的增量清单
+    return sorted([p for p in root.rglob("*.json") if p.is_file() and p.name != EXTRACT_MANIFEST_NAME])
 
 
 @dataclass
@@ -251,7 +343,60 @@ class UiState:
 
 # -------- tbl：名字 + face --------
 
-def load_char_names(tbl_dir: Path) -> Tuple[Dict[int, Dict[int, str]], Dict[int, Dict[int, str]]]:
+CHAR_CACHE_NAME = ".textjson_char_names.cache"
+# 解析规则或缓存结构改动时加 1，旧缓存自动作废
+_CHAR_CACHE_FORMAT = 2
+
+CharTables = Tuple[Dict[int, Dict[int, str]], Dict[int, Dict[int, str]]]
+
+
+def _char_tbl_files(tbl_dir: Path) -> List[Path]:
+    return [p for p in sorted(tbl_dir.glob("char*.tbl")) if TBL_FILE_RE.match(p.name)]
+
+
+def _char_tables_sig(paths: List[Path]) -> List[Tuple[str, int, int]]:
+    sig: List[Tuple[str, int, int]] = []
+    for p in paths:
+        st = p.stat()
+        sig.append((p.name, st.st_size, st.st_mtime_ns))
+    return sig
+
+
+def _int_keyed(d: Dict[str, Dict[str, str]]) -> Dict[int, Dict[int, str]]:
+    return {int(k): {int(i): str(v) for i, v in sub.items()} for k, sub in d.items()}
+
+
+def load_char_names(tbl_dir: Path, *, cache_dir: Optional[Path] = None) -> CharTables:
+    # 给出 cache_dir（d/da 的 JSON 输出目录）时，解析结果以 JSON 缓存在 cache_dir/.textjson_char_names.cache，
+    # 按 tbl_dir 和各 char*.tbl 的文件名、大小、mtime 校验；任一表有变化（或缓存损坏、目录只读）就重新解析，
+    # 结果与不用缓存完全相同。extract 目录里不写任何东西
+    paths = _char_tbl_files(tbl_dir)
+    if cache_dir is None:
+        return parse_char_tables(paths)
+
+    cache_path = cache_dir / CHAR_CACHE_NAME
+    key = str(tbl_dir.resolve())
+    sig = [list(t) for t in _char_tables_sig(paths)]
+    try:
+        data = json.loads(cache_path.read_text(encoding="utf-8"))
+        if data["format"] == _CHAR_CACHE_FORMAT and data["tbl_dir"] == key and data["sig"] == sig:
+            return _int_keyed(data["names"]), _int_keyed(data["face_l"])
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+
+    tables = parse_char_tables(paths)
+    data = {"format": _CHAR_CACHE_FORMAT, "tbl_dir": key, "sig": sig, "names": tables[0], "face_l": tables[1]}
+    tmp = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, cache_path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+    return tables
+
+
+def parse_char_tables(paths: List[Path]) -> CharTables:
     names: Dict[int, Dict[int, str]] = {}
     face_l: Dict[int, Dict[int, str]] = {}
 
@@ -263,10 +408,7 @@ def load_char_names(tbl_dir: Path) -> Tuple[Dict[int, Dict[int, str]], Dict[int,
         if fl:
             face_l[cid] = dict(fl)
 
-    for p in sorted(tbl_dir.glob("char*.tbl")):
-        if not TBL_FILE_RE.match(p.name):
-            continue
-
+    for p in paths:
         lines = p.read_text(encoding="cp932", errors="ignore").splitlines()
 
         cur_id: Optional[int] = None
@@ -380,44 +522,54 @@ def build_context(
 
 # -------- 提取 --------
 
-def extract_from_text(
-    script_text: str,
-    char_names: Dict[int, Dict[int, str]],
-    face_l: Dict[int, Dict[int, str]],
-) -> List[dict]:
-    in_code = False
-    stack: List[StackVal] = []
-    st = UiState()
-
-    out: List[dict] = []
-    used_keys: set[str] = set()
-    code_line = 0  # [CODE] 内行号（从 [CODE] 后第一行算 1）
-
-    def make_key(cl: int) -> str:
+class StackSim:
+    # [CODE] 的栈模拟；extract_from_text 按文本行喂，extract_from_asb 直接喂解码后的指令
+    def __init__(
+        self,
+        char_names: Dict[int, Dict[int, str]],
+        face_l: Dict[int, Dict[int, str]],
+    ) -> None:
+        self.char_names = char_names
+        self.face_l = face_l
+        self.in_code = False
+        self.stack: List[StackVal] = []
+        self.st = UiState()
+        self.out: List[dict] = []
+        self.used_keys: set[str] = set()
+        self.code_line = 0  # [CODE] 内行号（从 [CODE] 后第一行算 1）
+        self.key_funcs: Dict[str, int] = {}  # key -> 输出这条文本的 CALLB func id（不写进 JSON，给索引等工具用）
+
+    def make_key(self, cl: int) -> str:
         base = key_from_codeline(cl)
         key = base
         n = 2
-        while key in used_keys:
+        while key in self.used_keys:
             key = f"{base}_{n}"
             n += 1
-        used_keys.add(key)
+        self.used_keys.add(key)
         return key
 
-    def emit_text(text_line: str, cl: int, context: str) -> None:
-        out.append({
-            "key": make_key(cl),
+    def emit_text(self, text_line: str, cl: int, context: str, func: int) -> None:
+        key = self.make_key(cl)
+        self.key_funcs[key] = func
+        self.out.append({
+            "key": key,
             "original": text_line,
             "translation": "",
             "stage": 0,
             "context": context,
         })
 
-    def handle_call(argc: int, func: int) -> None:
-        nonlocal stack, st
+    def drop_args(self, argc: int) -> None:
+        take = min(argc, len(self.stack))
+        del self.stack[-take:]
+
+    def handle_call(self, argc: int, func: int) -> None:
+        st = self.st
 
-        take = min(argc, len(stack))
-        args = stack[-take:]
-        stack = stack[:-take]
+        take = min(argc, len(self.stack))
+        args = self.stack[-take:]
+        del self.stack[-take:]
 
         if func in (0x13, 0x14):
             st.narration = False
@@ -447,16 +599,16 @@ def extract_from_text(
 
             if func == 0x00:
                 for a in texts:
-                    emit_text(str(a.value), a.code_line or 0, build_context(st, char_names, face_l))
+                    self.emit_text(str(a.value), a.code_line or 0, build_context(st, self.char_names, self.face_l), func)
             elif func == 0x01:
                 for k, a in enumerate(texts, start=1):
-                    emit_text(str(a.value), a.code_line or 0, f"choice{k}")
+                    self.emit_text(str(a.value), a.code_line or 0, f"choice{k}", func)
             else:
                 for k, a in enumerate(texts, start=1):
-                    emit_text(str(a.value), a.code_line or 0, f"choice{k}")
+                    self.emit_text(str(a.value), a.code_line or 0, f"choice{k}", func)
 
-    def apply_stack_effect(op: str) -> None:
-        nonlocal stack
+    def apply_stack_effect(self, op: str) -> None:
+        stack = self.stack
 
         if op in ("ADD", "SUB", "MUL", "DIV", "MOD", "AND", "OR", "EQ", "NEQ", "LT", "GT", "LEQ", "GEQ"):
             if len(stack) >= 2:
@@ -490,63 +642,155 @@ def extract_from_text(
             stack.append(StackVal("sym", "R"))
             return
 
-    for raw in script_text.splitlines():
-        line = raw.rstrip("\r\n")
+    def feed_line(self, raw: str) -> None:
+        self.feed_lines((raw,))
 
-        if line.strip() == "[CODE]":
-            in_code = True
-            code_line = 0
-            continue
+    def feed_lines(self, lines: Iterable[str]) -> None:
+        # 行首 token 查一次 LINE_DISPATCH，代替逐个正则试 PUSHI/PUSHL/.../CALLG；
+        # 循环里用到的属性和表先绑成局部变量
+        stack = self.stack
+        in_code = self.in_code
+        code_line = self.code_line
+        dispatch_get = LINE_DISPATCH.get
+        other_ops = OTHER_OPS
+        other_op_match = OTHER_OP_RE.match
 
-        if in_code and is_section_header(line) and line.strip() != "[CODE]":
-            in_code = False
+        for raw in lines:
+            line = raw.rstrip("\r\n")
+            t = line.strip()
+            if not t:
+                if in_code:
+                    code_line += 1
+                continue
 
-        if not in_code:
-            continue
+            c0 = t[0]
+            if c0 == "[":
+                # [..] 行不会是指令也不会是文本；[CODE] 重新开始计数，其它 [..] 结束代码段
+                if t == "[CODE]":
+                    in_code = True
+                    code_line = 0
+                elif in_code:
+                    if t.endswith("]"):
+                        in_code = False
+                    else:
+                        code_line += 1
+                continue
 
-        code_line += 1
+            if not in_code:
+                continue
+            code_line += 1
 
-        m = PUSHI_RE.match(line)
-        if m:
-            stack.append(StackVal("int", u32(m.group(1))))
-            continue
-        m = PUSHL_RE.match(line)
-        if m:
-            stack.append(StackVal("sym", f"L:{m.group(1).upper()}"))
-            continue
-        m = PUSHG_RE.match(line)
-        if m:
-            stack.append(StackVal("sym", f"G:{m.group(1).upper()}"))
-            continue
-        m = PUSHF_RE.match(line)
-        if m:
-            stack.append(StackVal("sym", f"F:{m.group(1).upper()}"))
-            continue
+            op, _, rest = t.partition(" ")
+            if not op.isprintable():
+                op, rest = split_op(t)
+            entry = dispatch_get(op)
+            if entry is not None:
+                m = entry[0].fullmatch(rest.lstrip())
+                if m is not None:
+                    entry[1](self, m)
+                    continue
+            if op in other_ops or other_op_match(op):
+                self.apply_stack_effect(op)
+            elif c0 != "@" and not t.startswith("__"):
+                stack.append(StackVal("text", line, code_line))
+
+        self.in_code = in_code
+        self.code_line = code_line
+
+
+def _push_int(sim: StackSim, m: "re.Match[str]") -> None:
+    sim.stack.append(StackVal("int", u32(m.group(0))))
+
+def _push_sym(tag: str) -> Callable[[StackSim, "re.Match[str]"], None]:
+    prefix = f"{tag}:"
+    def push(sim: StackSim, m: "re.Match[str]") -> None:
+        sim.stack.append(StackVal("sym", prefix + m.group(0).upper()))
+    return push
+
+def _call_builtin(sim: StackSim, m: "re.Match[str]") -> None:
+    sim.handle_call(int(m.group(1), 16), u32(m.group(2)))
+
+def _call_script(sim: StackSim, m: "re.Match[str]") -> None:
+    sim.drop_args(int(m.group(1), 16))
+
+# feed_line 的分发表：行首 token -> (OPERAND_RES 里的操作数正则, 匹配后的动作)
+LINE_DISPATCH: Dict[str, Tuple["re.Pattern[str]", Callable[[StackSim, "re.Match[str]"], None]]] = {
+    op: (OPERAND_RES[op], action)
+    for op, action in (
+        ("PUSHI", _push_int),
+        ("PUSHL", _push_sym("L")),
+        ("PUSHG", _push_sym("G")),
+        ("PUSHF", _push_sym("F")),
+        ("CALLB", _call_builtin),
+        ("CALLI", _call_builtin),
+        ("CALLL", _call_script),
+        ("CALLG", _call_script),
+    )
+}
 
-        m = CALLB_RE.match(line) or CALLI_RE.match(line)
-        if m:
-            argc = int(m.group(1), 16)
-            func = u32(m.group(2))
-            handle_call(argc, func)
-            continue
 
-        m = CALLL_RE.match(line) or CALLG_RE.match(line)
-        if m:
-            argc = int(m.group(1), 16)
-            take = min(argc, len(stack))
-            stack = stack[:-take]
-            continue
+def extract_from_text(
+    script_text: str,
+    char_names: Dict[int, Dict[int, str]],
+    face_l: Dict[int, Dict[int, str]],
+) -> List[dict]:
+    sim = StackSim(char_names, face_l)
+    sim.feed_lines(script_text.splitlines())
+    return sim.out
 
-        op = line.strip().split()[0] if line.strip() else ""
-        if op and OTHER_OP_RE.match(op):
-            apply_stack_effect(op)
-            continue
 
-        if is_text_param_line(line):
-            stack.append(StackVal("text", line, code_line))
+def extract_from_asb(
+    data: bytes,
+    char_names: Dict[int, Dict[int, str]],
+    face_l: Dict[int, Dict[int, str]],
+) -> List[dict]:
+    return simulate_asb(data, char_names, face_l).out
+
+
+def simulate_asb(
+    data: bytes,
+    char_names: Dict[int, Dict[int, str]],
+    face_l: Dict[int, Dict[int, str]],
+) -> StackSim:
+    # 结果与 asb.py d 之后再 extract_from_text 完全相同，但直接吃 parse_code + apply_string_mappings 的指令列表，
+    # 省掉整份 TXT 的写出和逐行正则解析。
+    # 只有文本行（以及形状不规范的指令）还按行走 feed_line，保证 [..] 文本、行号等边角行为一致
+    dec = asb.decode_asb(data)
+    sim = StackSim(char_names, face_l)
+    sim.feed_line("[CODE]")
+
+    for insn in dec.insns:
+        name = insn.name
+        v = insn.values
+        if insn.text_only or not name:
+            line = asb.insn_line(insn)
+            if line is None:
+                continue
+            # 与写出 TXT 再 splitlines() 的切行方式一致（文本里可能混有 \r、\x0c 等）
+            for piece in (line + "\n").splitlines():
+                sim.feed_line(piece)
+            continue
+        if not sim.in_code:
+            continue
+        if (name in asb.PUSH_OPCODES and name != "PUSHR" and len(v) != 1) or (name in ("CALLB", "CALLL") and len(v) != 2):
+            sim.feed_line(asb.insn_line(insn) or "")
             continue
 
-    return out
+        sim.code_line += 1
+        if name == "PUSHI":
+            sim.stack.append(StackVal("int", v[0]))
+        elif name == "PUSHL":
+            sim.stack.append(StackVal("sym", f"L:{asb.fmt_u8(v[0])}"))
+        elif name in ("PUSHG", "PUSHF"):
+            sim.stack.append(StackVal("sym", f"{name[-1]}:{asb.fmt_u32(v[0])}"))
+        elif name == "CALLB":
+            sim.handle_call(v[1], v[0])
+        elif name == "CALLL":
+            sim.drop_args(v[1])
+        else:
+            sim.apply_stack_effect(name)
+
+    return sim
 
 
 # -------- list.txt（可选） --------
@@ -586,19 +830,146 @@ def output_json_path(out_root: Path, rel_txt: Path, title: str) -> Path:
 
 # -------- d / e 命令 --------
 
-def cmd_decode_extract(inp: Path, out: Path, tbl_dir: Path, list_txt: Optional[Path]) -> None:
-    char_names, face_l = load_char_names(tbl_dir)
-    mapping = parse_list_txt(list_txt) if (list_txt is not None and list_txt.exists()) else {}
+EXTRACT_MANIFEST_NAME = ".textjson_manifest.json"
+WRITEBACK_MANIFEST_NAME = ".textjson_ea_manifest.json"
 
-    for txt in iter_txt_files(inp):
-        script = read_text_guess(txt)
-        items = extract_from_text(script, char_names, face_l)
+# 进程池 worker 里的 char*.tbl 解析结果；由 _init_extract_worker 在每个 worker 启动时设置一次
+_worker_tables: Tuple[Dict[int, Dict[int, str]], Dict[int, Dict[int, str]]] = ({}, {})
 
-        rel = txt.relative_to(inp)
-        title = mapping.get(f"{txt.stem}.asb", "")
-        out_json = output_json_path(out, rel, title)
+
+def _init_extract_worker(char_names: Dict[int, Dict[int, str]], face_l: Dict[int, Dict[int, str]]) -> None:
+    global _worker_tables
+    _worker_tables = (char_names, face_l)
+
+
+def _extract_one(task: Tuple[str, Path, Path]) -> Tuple[Path, int, Optional[str]]:
+    # 单个脚本出错只记录，不中断整批
+    mode, src, out_json = task
+    char_names, face_l = _worker_tables
+    try:
+        data = src.read_bytes()
+        if mode == "da":
+            items = extract_from_asb(data, char_names, face_l)
+        else:
+            script = data.decode("utf-8")
+            items = extract_from_text(script, char_names, face_l)
         out_json.parent.mkdir(parents=True, exist_ok=True)
         out_json.write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
+        return src, len(items), None
+    except Exception as e:
+        return src, 0, f"{type(e).__name__}: {e}"
+
+
+def _extract_version(mode: str) -> str:
+    # 提取逻辑（本文件 / da 用到的 asb.py）改动后旧 JSON 全部重新生成
+    h = hashlib.sha1(mode.encode("ascii"))
+    h.update(Path(__file__).read_bytes())
+    h.update(Path(asb.__file__).read_bytes())
+    return h.hexdigest()
+
+
+def _extract_deps_sig(tbl_dir: Path, list_txt: Optional[Path]) -> str:
+    # 影响所有脚本输出的外部输入：char*.tbl（名字/表情）和 list.txt（JSON 文件名里的标题）
+    h = hashlib.sha1()
+    for p in _char_tbl_files(tbl_dir):
+        h.update(p.name.encode("utf-8") + b"\0")
+        h.update(p.read_bytes())
+        h.update(b"\0")
+    if list_txt is not None and list_txt.exists():
+        h.update(b"list.txt\0")
+        h.update(list_txt.read_bytes())
+    return h.hexdigest()
+
+
+def _load_extract_manifest(p: Path) -> Dict[str, Any]:
+    try:
+        data = json.loads(p.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def extract_dir(
+    mode: str,
+    inp: Path,
+    out: Path,
+    tbl_dir: Path,
+    list_txt: Optional[Path],
+    *,
+    jobs: int = 1,
+    force: bool = False,
+) -> int:
+    # mode: "d"（txt 目录）或 "da"（asb 目录）。输入、char*.tbl、list.txt 都没变的脚本直接跳过；
+    # 返回失败的脚本数
+    char_names, face_l = load_char_names(tbl_dir, cache_dir=out)
+    mapping = parse_list_txt(list_txt) if (list_txt is not None and list_txt.exists()) else {}
+
+    manifest_path = out / EXTRACT_MANIFEST_NAME
+    version = _extract_version(mode)
+    deps = _extract_deps_sig(tbl_dir, list_txt)
+    old = _load_extract_manifest(manifest_path)
+    old_files: Dict[str, Dict[str, str]] = old.get("files", {}) if isinstance(old.get("files"), dict) else {}
+    reusable = not force and old.get("version") == version and old.get("deps") == deps
+
+    srcs = iter_asb_files(inp) if mode == "da" else iter_txt_files(inp)
+    tasks: List[Tuple[str, Path, Path]] = []
+    new_files: Dict[str, Dict[str, str]] = {}
+    rel_of: Dict[Path, str] = {}
+    skipped = 0
+    for src in srcs:
+        rel = src.relative_to(inp)
+        rel_key = rel.as_posix()
+        title = mapping.get(f"{src.stem}.asb", "")
+        out_json = output_json_path(out, rel.with_suffix(".txt"), title)
+        digest = hashlib.sha1(src.read_bytes()).hexdigest()
+        new_files[rel_key] = {"sha1": digest, "out": out_json.relative_to(out).as_posix()}
+        rel_of[src] = rel_key
+        prev = old_files.get(rel_key)
+        if reusable and prev == new_files[rel_key] and out_json.exists():
+            skipped += 1
+            continue
+        tasks.append((mode, src, out_json))
+
+    t0 = time.perf_counter()
+    if jobs <= 1 or len(tasks) <= 1:
+        _init_extract_worker(char_names, face_l)
+        results = [_extract_one(t) for t in tasks]
+    else:
+        # 名字表只在每个 worker 启动时传一次，不随每个任务重复序列化
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_extract_worker, initargs=(char_names, face_l)
+        ) as ex:
+            results = list(ex.map(_extract_one, tasks, chunksize=max(1, len(tasks) // (jobs * 8))))
+    elapsed = time.perf_counter() - t0
+
+    failed = [(src, err) for src, _, err in results if err is not None]
+    for src, err in failed:
+        print(f"[ERROR] {src}: {err}", file=sys.stderr)
+        # 失败的脚本不写入清单，下次运行会重新提取
+        new_files.pop(rel_of[src], None)
+
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest = {"version": version, "deps": deps, "files": new_files}
+    manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    tag = "[WARN]" if failed else "[OK]"
+    print(
+        f"{tag} 提取 {len(results) - len(failed)}/{len(results)} 个脚本，{sum(n for _, n, _ in results)} 条文本，"
+        f"{elapsed:.2f} s（jobs={jobs}），跳过未变化 {skipped} 个，失败 {len(failed)}",
+        file=sys.stderr,
+    )
+    return len(failed)
+
+def cmd_decode_extract(
+    inp: Path, out: Path, tbl_dir: Path, list_txt: Optional[Path], *, jobs: int = 1, force: bool = False
+) -> int:
+    return extract_dir("d", inp, out, tbl_dir, list_txt, jobs=jobs, force=force)
+
+def cmd_decode_extract_asb(
+    inp: Path, out: Path, tbl_dir: Path, list_txt: Optional[Path], *, jobs: int = 1, force: bool = False
+) -> int:
+    # 与 asb.py d + cmd_decode_extract 产出相同的 JSON，直接读 .asb，不经过 Raw/TXT
+    return extract_dir("da", inp, out, tbl_dir, list_txt, jobs=jobs, force=force)
 
 def build_json_to_txt_map(json_dir: Path) -> Dict[str, Path]:
     """
@@ -617,6 +988,169 @@ def build_json_to_txt_map(json_dir: Path) -> Dict[str, Path]:
         m[txt_rel] = jp
     return m
 
+def load_trans_map(jp: Path, txt_rel_posix: str, conv: Callable[[str], str]) -> Dict[int, str]:
+    # [CODE] 行号 -> 写回的文本行（换行已转成 \\n，并过了映射码表）
+    items = json.loads(jp.read_text(encoding="utf-8", errors="ignore"))
+
+    trans_map: Dict[int, str] = {}
+    if isinstance(items, list):
+        for it in items:
+            if not isinstance(it, dict):
+                continue
+            tr = it.get("translation")
+            if not isinstance(tr, str) or tr == "":
+                continue
+            key = it.get("key", "")
+            if not isinstance(key, str) or not key.strip():
+                continue
+
+            cl = parse_codeline_from_key(key)
+            if not isinstance(cl, int) or cl <= 0:
+                continue
+
+            tr_norm = tr.replace("\r\n", "\n").replace("\r", "\n").replace("\n", "\\n")
+            tr_norm = conv(tr_norm)
+            tr_norm = wrap_text(tr_norm, f"{txt_rel_posix}:{cl}:{key}")
+
+            if cl in trans_map and trans_map[cl] != tr_norm:
+                raise SystemExit(f"同一行号出现多个不同翻译：script={txt_rel_posix} line={cl} key={key}")
+            trans_map[cl] = tr_norm
+    return trans_map
+
+def iter_text_param_lines(script: str) -> Iterator[Tuple[int, int, str]]:
+    # 与 StackSim 相同的 [CODE] 行号规则，逐个给出文本参数行：
+    # (行号, 行首在 script 中的字符偏移, 去掉行尾 \r\n 的行内容)
+    in_code = False
+    code_line = 0
+    pos = 0
+
+    for raw in script.splitlines(keepends=True):
+        start = pos
+        pos += len(raw)
+        line = raw.rstrip("\r\n")
+        t = line.strip()
+
+        if t == "[CODE]":
+            in_code = True
+            code_line = 0
+            continue
+
+        if in_code and t.startswith("[") and t.endswith("]"):
+            in_code = False
+            continue
+
+        if not in_code:
+            continue
+
+        code_line += 1
+        if is_text_param_line(line):
+            yield code_line, start, line
+
+def _leading_ws(line: str) -> str:
+    return line[:len(line) - len(line.lstrip())]
+
+def writeback_script(script: str, trans_map: Dict[int, str]) -> str:
+    # 只替换有翻译的文本行（保留行首空白和原来的换行符），其余原样拼回
+    out_chunks: List[str] = []
+    last = 0
+    for code_line, start, line in iter_text_param_lines(script):
+        tr = trans_map.get(code_line)
+        if tr is None:
+            continue
+        out_chunks.append(script[last:start])
+        out_chunks.append(_leading_ws(line) + tr)
+        last = start + len(line)
+    out_chunks.append(script[last:])
+    return "".join(out_chunks)
+
+
+# -------- 行位置索引：e 扫描某个 txt 时记下每个文本行的字节位置，之后对同一份 txt 直接拼接 --------
+
+LINE_INDEX_DIR = ".textjson_lines"
+# magic, 格式版本, 源 txt 字节数, 源 txt sha1, 条目数；之后每条 4 个 u32：行号, 字节偏移, 字节长度, crc32
+_LINE_INDEX_HEAD = struct.Struct("<4sIQ20sI")
+_LINE_INDEX_MAGIC = b"TJLI"
+_LINE_INDEX_FORMAT = 1
+
+
+def line_index_path(txt_root: Path, txt_rel: Path) -> Path:
+    # 索引描述的是 txt，跟着 txt 目录走（<txt目录>/.textjson_lines/abc.idx），与 json 放在哪、由 d 还是 da 生成无关
+    return txt_root / LINE_INDEX_DIR / txt_rel.with_suffix(".idx")
+
+
+def build_line_index(data: bytes, script: str) -> bytes:
+    # data 是 txt 原始字节，script 是它的 utf-8 解码
+    rows: List[int] = []
+    char_pos = 0
+    byte_pos = 0
+    for code_line, start, line in iter_text_param_lines(script):
+        byte_pos += len(script[char_pos:start].encode("utf-8"))
+        char_pos = start
+        seg = line.encode("utf-8")
+        rows += (code_line, byte_pos, len(seg), zlib.crc32(seg))
+    head = _LINE_INDEX_HEAD.pack(_LINE_INDEX_MAGIC, _LINE_INDEX_FORMAT, len(data), hashlib.sha1(data).digest(), len(rows) // 4)
+    return head + struct.pack(f"<{len(rows)}I", *rows)
+
+
+def writeback_indexed(data: bytes, trans_map: Dict[int, str], index: bytes) -> Optional[bytes]:
+    # 按行位置索引把翻译直接拼进 txt 字节，结果与 writeback_script 相同；
+    # 索引与 txt 对不上（txt 改过、格式旧、条目校验失败）时返回 None，由调用方退回全量扫描
+    head = _LINE_INDEX_HEAD
+    if len(index) < head.size:
+        return None
+    magic, fmt, size, digest, n = head.unpack_from(index, 0)
+    if magic != _LINE_INDEX_MAGIC or fmt != _LINE_INDEX_FORMAT or size != len(data) or len(index) != head.size + 16 * n:
+        return None
+    if hashlib.sha1(data).digest() != digest:
+        return None
+
+    vals = struct.unpack_from(f"<{4 * n}I", index, head.size)
+    spans = {vals[i]: i for i in range(0, len(vals), 4)}
+
+    out = bytearray()
+    last = 0
+    # 行号递增即字节偏移递增
+    for code_line in sorted(trans_map):
+        i = spans.get(code_line)
+        if i is None:
+            # 不是文本参数行：全量扫描同样不会替换
+            continue
+        off, length, crc = vals[i + 1], vals[i + 2], vals[i + 3]
+        seg = data[off:off + length]
+        if zlib.crc32(seg) != crc:
+            return None
+        out += data[last:off]
+        out += (_leading_ws(seg.decode("utf-8")) + trans_map[code_line]).encode("utf-8")
+        last = off + length
+    out += data[last:]
+    return bytes(out)
+
+def writeback_asb(data: bytes, trans_map: Dict[int, str], filename: str) -> bytes:
+    # 原始 .asb + 翻译 -> 新 .asb，结果与 asb.py d、writeback_script、asb.py e 三步相同。
+    # 翻译直接替换到指令列表里对应行号的文本上，再由 asb.encode_decoded_asb 重建字符串池；
+    # 遇到写成 TXT 后行号会错位的文本（内嵌 \x0c、形如 [..] 等）就整份退回文本路径
+    dec = asb.decode_asb(data)
+    code_line = 0
+    for insn in dec.insns:
+        if insn.text_only:
+            line = asb.insn_line(insn) or ""
+            if not asb.txt_line_roundtrips(line) or is_section_header(line):
+                break
+            code_line += 1
+            if is_text_param_line(line) and code_line in trans_map:
+                leading_ws = re.match(r"^(\s*)", line).group(1)
+                insn.operands = [f"{leading_ws}{trans_map[code_line]}"]
+            continue
+        if insn.name:
+            code_line += 1
+    else:
+        out = asb.encode_decoded_asb(dec, filename)
+        if out is not None:
+            return out
+
+    script = asb.decode_asb_bytes(data)
+    return asb.encode_asb_text(writeback_script(script, trans_map), filename)
+
 def cmd_encode_writeback(
     scripts_in: Path,
     scripts_out: Path,
@@ -626,6 +1160,7 @@ def cmd_encode_writeback(
     mapping = build_json_to_txt_map(json_dir)
 
     missing: List[str] = []
+    indexed = 0
 
     for txt_rel_posix, jp in mapping.items():
         txt_rel = Path(txt_rel_posix)
@@ -634,77 +1169,131 @@ def cmd_encode_writeback(
             missing.append(txt_rel_posix)
             continue
 
-        script = read_text_guess(in_txt)
-
-        items = json.loads(jp.read_text(encoding="utf-8", errors="ignore"))
-
-        trans_map: Dict[int, str] = {}
-        if isinstance(items, list):
-            for it in items:
-                if not isinstance(it, dict):
-                    continue
-                tr = it.get("translation")
-                if not isinstance(tr, str) or tr == "":
-                    continue
-                key = it.get("key", "")
-                if not isinstance(key, str) or not key.strip():
-                    continue
+        data = in_txt.read_bytes()
+        trans_map = load_trans_map(jp, txt_rel_posix, conv)
+
+        # 先按上次留下的行位置索引直接拼接；索引缺失或过期（按 txt 的大小和 sha1 校验）就整份逐行扫描，
+        # 并按当前 txt 重建索引，下次直接拼接。txt 目录不可写时只是用不上索引
+        out_bytes: Optional[bytes] = None
+        index_path = line_index_path(scripts_in, txt_rel)
+        if index_path.is_file():
+            out_bytes = writeback_indexed(data, trans_map, index_path.read_bytes())
+        if out_bytes is None:
+            script = data.decode("utf-8")
+            out_bytes = writeback_script(script, trans_map).encode("utf-8")
+            try:
+                index_path.parent.mkdir(parents=True, exist_ok=True)
+                index_path.write_bytes(build_line_index(data, script))
+            except OSError:
+                pass
+        else:
+            indexed += 1
 
-                cl = parse_codeline_from_key(key)
-                if not isinstance(cl, int) or cl <= 0:
-                    continue
+        out_path = scripts_out / txt_rel
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_bytes(out_bytes)
 
-                tr_norm = tr.replace("\r\n", "\n").replace("\r", "\n").replace("\n", "\\n")
-                tr_norm = conv(tr_norm)
-                tr_norm = wrap_text(tr_norm, f"{txt_rel_posix}:{cl}:{key}")
+    print(f"[OK] 写回 {len(mapping) - len(missing)} 个脚本，其中按行位置索引直接拼接 {indexed} 个", file=sys.stderr)
 
-                if cl in trans_map and trans_map[cl] != tr_norm:
-                    raise SystemExit(f"同一行号出现多个不同翻译：script={txt_rel_posix} line={cl} key={key}")
-                trans_map[cl] = tr_norm
+    if missing:
+        # 直接报错更安全：避免你以为都写回了
+        show = "\n".join(missing[:50])
+        more = "" if len(missing) <= 50 else f"\n... 还有 {len(missing)-50} 个"
+        raise SystemExit(f"找不到对应的脚本 txt（按 json 名字去括号推导）：\n{show}{more}")
 
-        in_code = False
-        code_line = 0
-        out_chunks: List[str] = []
+def _writeback_deps_sig() -> str:
+    # 影响所有写回结果的外部输入：译文转换规则（char.py）和当前目录的映射码表 font.tbl
+    h = hashlib.sha1(Path(char.__file__).read_bytes())
+    if char.MAP_PATH.is_file():
+        h.update(char.MAP_PATH.read_bytes())
+    return h.hexdigest()
 
-        for raw in script.splitlines(keepends=True):
-            line = raw.rstrip("\r\n")
-            eol = raw[len(line):]
 
-            if line.strip() == "[CODE]":
-                in_code = True
-                code_line = 0
-                out_chunks.append(line + eol)
-                continue
+def cmd_encode_writeback_asb(
+    asb_in: Path,
+    asb_out: Path,
+    json_dir: Path,
+    *,
+    force: bool = False,
+) -> None:
+    # 原始 .asb + JSON 直接写出新 .asb，不经过 Raw/TXT、Raw/RE_TXT。
+    # 与 asb.py e 的增量编码一样：原始 .asb、JSON、工具版本、font.tbl 都没变的脚本跳过，
+    # 清单在 <asb输出目录>/.textjson_ea_manifest.json。每个脚本的 wrap.log / overflow.log 记录也存在清单里，
+    # 跳过时照样补写，两个日志与全量写回一致
+    global _wrap_log_capture
+    conv = make_translation_converter()
+    mapping = build_json_to_txt_map(json_dir)
 
-            if in_code and is_section_header(line) and line.strip() != "[CODE]":
-                in_code = False
-                out_chunks.append(line + eol)
-                continue
+    manifest_path = asb_out / WRITEBACK_MANIFEST_NAME
+    version = _extract_version("ea")
+    deps = _writeback_deps_sig()
+    old = _load_extract_manifest(manifest_path)
+    old_files: Dict[str, Dict[str, Any]] = old.get("files", {}) if isinstance(old.get("files"), dict) else {}
+    reusable = not force and old.get("version") == version and old.get("deps") == deps
 
-            if not in_code:
-                out_chunks.append(line + eol)
-                continue
+    missing: List[str] = []
+    new_files: Dict[str, Dict[str, Any]] = {}
+    written = skipped = 0
 
-            code_line += 1
+    for txt_rel_posix, jp in mapping.items():
+        asb_rel = Path(txt_rel_posix).with_suffix(".asb")
+        in_asb = asb_in / asb_rel
+        if not in_asb.exists():
+            missing.append(asb_rel.as_posix())
+            continue
 
-            if is_text_param_line(line) and code_line in trans_map:
-                leading_ws = re.match(r"^(\s*)", raw).group(1) if raw else ""
-                out_chunks.append(f"{leading_ws}{trans_map[code_line]}{eol}")
-            else:
-                out_chunks.append(line + eol)
+        data = in_asb.read_bytes()
+        rel_key = asb_rel.as_posix()
+        out_path = asb_out / asb_rel
+        entry: Dict[str, Any] = {
+            "asb": hashlib.sha1(data).hexdigest(),
+            "json": hashlib.sha1(jp.read_bytes()).hexdigest(),
+            "out": rel_key,
+        }
+        new_files[rel_key] = entry
+        prev = old_files.get(rel_key)
+        if (
+            reusable
+            and isinstance(prev, dict)
+            and all(prev.get(k) == v for k, v in entry.items())
+            and isinstance(prev.get("logs"), list)
+            and out_path.exists()
+        ):
+            for tag, record in prev["logs"]:
+                _append_wrap_log(tag, record)
+            entry["logs"] = prev["logs"]
+            skipped += 1
+            continue
 
-        out_text = "".join(out_chunks)
-        out_bytes =  out_text.encode("utf-8")
+        _wrap_log_capture = []
+        try:
+            trans_map = load_trans_map(jp, txt_rel_posix, conv)
+        finally:
+            entry["logs"], _wrap_log_capture = _wrap_log_capture, None
+        out_bytes = writeback_asb(data, trans_map, asb_rel.name)
 
-        out_path = scripts_out / txt_rel
         out_path.parent.mkdir(parents=True, exist_ok=True)
         out_path.write_bytes(out_bytes)
+        written += 1
+
+    # JSON 已删除的脚本：清掉上次由它写出的 .asb
+    removed = 0
+    for rel_key, prev in old_files.items():
+        if rel_key in new_files or not isinstance(prev, dict) or not prev.get("out"):
+            continue
+        stale = asb_out / prev["out"]
+        if stale.is_file():
+            stale.unlink()
+            removed += 1
+
+    manifest = {"version": version, "deps": deps, "files": new_files}
+    manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"[OK] 写回 {written} 个 .asb，跳过未变化 {skipped} 个，删除过期输出 {removed} 个", file=sys.stderr)
 
     if missing:
-        # 直接报错更安全：避免你以为都写回了
         show = "\n".join(missing[:50])
         more = "" if len(missing) <= 50 else f"\n... 还有 {len(missing)-50} 个"
-        raise SystemExit(f"找不到对应的脚本 txt（按 json 名字去括号推导）：\n{show}{more}")
+        raise SystemExit(f"找不到对应的 .asb（按 json 名字去括号推导）：\n{show}{more}")
 
 
 # -------- sys.argv CLI --------
@@ -713,13 +1302,26 @@ def print_help_and_exit(code: int = 0) -> None:
     msg = (
         "用法：\n"
         "  解码/提取到 JSON：\n"
-        "    python textJson.py d <脚本txt目录> <json输出目录> <extract目录>\n"
+        "    python textJson.py d <脚本txt目录> <json输出目录> <extract目录> [--jobs N] [--force]\n"
+        "\n"
+        "  直接从 .asb 提取到 JSON（结果与先 asb.py d 再 d 相同，不生成 TXT）：\n"
+        "    python textJson.py da <asb目录> <json输出目录> <extract目录> [--jobs N] [--force]\n"
+        "\n"
+        "  d/da 默认按 CPU 核数并行；输入、char*.tbl、list.txt 都没变的脚本跳过不重写，\n"
+        "  清单在 <json输出目录>/.textjson_manifest.json，--force 全部重新提取\n"
         "\n"
         "  编码/写回脚本（按 json 推导 txt：去掉括号，后缀改 txt）：\n"
         "    python textJson.py e <脚本txt目录> <写回输出目录> <json目录> [映射码表]\n"
+        "    第一次写回某个 txt 时在 <脚本txt目录>/.textjson_lines 记下行位置索引，之后 txt 没变就直接按位置替换\n"
+        "\n"
+        "  直接写回 .asb（原始 .asb + json -> 新 .asb，结果与 e 之后再 asb.py e 相同，不生成 TXT）：\n"
+        "    python textJson.py ea <原始asb目录> <asb输出目录> <json目录> [--force]\n"
+        "    原始 .asb、json、font.tbl 都没变的脚本跳过不重写，清单在 <asb输出目录>/.textjson_ea_manifest.json\n"
         "\n"
         "可选参数：\n"
         "  映射码表：UTF-16LE，格式：889F=亚\n"
+        "\n"
+        f"e/ea 自动换行：一行 {WRAP_LIMIT_CELLS} 个半角格，按写回后的 cp932 编码计宽（双字节字 2 格，单字节字 1 格）\n"
     )
     raise SystemExit(msg if code == 0 else msg)
 
@@ -728,16 +1330,31 @@ def main() -> None:
     argv = sys.argv[1:]
 
     rest: List[str] = []
-    for a in argv:
+    jobs = os.cpu_count() or 1
+    force = False
+    it = iter(argv)
+    for a in it:
         if a in ("-h", "--help", "/?"):
             print_help_and_exit(0)
+        elif a == "--force":
+            force = True
+        elif a in ("-j", "--jobs"):
+            v = next(it, None)
+            if v is None:
+                raise SystemExit(f"{a} 缺少参数")
+            jobs = int(v, 10)
+        elif a.startswith("--jobs="):
+            jobs = int(a.split("=", 1)[1], 10)
         else:
             rest.append(a)
+    jobs = max(1, jobs)
 
     if len(rest) < 4:
         raise SystemExit("参数不完整。\n" + (
             "用法：python textJson.py d <脚本txt目录> <json输出目录> <extract目录>\n"
+            "   或：python textJson.py da <asb目录> <json输出目录> <extract目录>\n"
             "   或：python textJson.py e <脚本txt目录> <写回输出目录> <json目录>\n"
+            "   或：python textJson.py ea <原始asb目录> <asb输出目录> <json目录>\n"
         ))
 
     mode = rest[0].lower()
@@ -747,18 +1364,26 @@ def main() -> None:
 
     out.mkdir(parents=True, exist_ok=True)
 
-    if mode == "d":
-        extract_dir = third
-        tbl_dir = extract_dir / "adv"
-        list_txt = extract_dir / "adv" / "scn" / "list.txt"
-        cmd_decode_extract(inp, out, tbl_dir, list_txt)
-    elif mode == "e":
+    if mode in ("d", "da"):
+        extract_root = third
+        tbl_dir = extract_root / "adv"
+        list_txt = extract_root / "adv" / "scn" / "list.txt"
+        if mode == "da":
+            failed = cmd_decode_extract_asb(inp, out, tbl_dir, list_txt, jobs=jobs, force=force)
+        else:
+            failed = cmd_decode_extract(inp, out, tbl_dir, list_txt, jobs=jobs, force=force)
+        if failed:
+            raise SystemExit(1)
+    elif mode in ("e", "ea"):
         Path("wrap.log").write_text("", encoding="utf-8")
         Path("overflow.log").write_text("", encoding="utf-8")        
         json_dir = third
-        cmd_encode_writeback(inp, out, json_dir)
+        if mode == "ea":
+            cmd_encode_writeback_asb(inp, out, json_dir, force=force)
+        else:
+            cmd_encode_writeback(inp, out, json_dir)
     else:
-        raise SystemExit("mode 必须是 d 或 e。\n用法：python textJson.py d ... 或 python textJson.py e ...\n")
+        raise SystemExit("mode 必须是 d、da、e 或 ea。\n用法：python textJson.py d ... 或 python textJson.py e ...\n")
 
 if __name__ == "__main__":
     main()